@@ -7,7 +7,6 @@ from datetime import timedelta
 
 # Import your application components
 from extension import db, register_oauth 
-from router import register_routes 
 
 # It's best practice to load environment variables at the very top
 load_dotenv()
@@ -68,14 +67,22 @@ def create_app():
     )
 
     # --- Register Blueprints ---
+    # Imported here: the routes load the models at import time, and process
+    # pool workers that re-import this module must not do that
+    from router import register_routes
     register_routes(app)
     
     return app
 
-app = create_app()
-with app.app_context():
-    db.create_all()
-if __name__ == "__main__":
+def bootstrap():
+    """Create the app and its tables; used by `python app.py` and wsgi.py."""
+    app = create_app()
+    with app.app_context():
         # This is fine for development, but for production,
         # consider using a migration tool like Flask-Migrate.
+        db.create_all()
+    return app
+
+if __name__ == "__main__":
+    app = bootstrap()
     app.run(host="0.0.0.0", port=5000, debug=False)  # Changed to debug=True for development
\ No newline at end of file
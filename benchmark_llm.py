@@ -0,0 +1,117 @@
+"""
+Decode-speed benchmark for the local LLaMA chat path.
+
+Runs a fixed prompt set through each decoding mode (plain, prompt-lookup
+and, if LLM_DRAFT_MODEL_PATH is set, a draft model) and reports
+tokens/sec and time to first token, so speculative decoding and quantized
+GGUF builds can be compared on the machine that will serve them.
+
+    python benchmark_llm.py
+    LLAMA_MODEL_QUANT=Q4_K_M python benchmark_llm.py --modes off prompt_lookup --runs 3
+"""
+import argparse
+import json
+import statistics
+import time
+from dotenv import load_dotenv
+
+from llm_engine import (
+    PREP_SYSTEM_PROMPT, SPECULATIVE_MODES, configured_model_path, configured_speculative, load_llama,
+    optimize_for_hardware,
+)
+
+load_dotenv()
+
+# Mix of free-form tutoring answers and answers that quote the prompt
+# (where prompt-lookup drafts should pay off)
+PROMPTS = [
+    "Explain the difference between mitosis and meiosis in simple terms.",
+    "Give me five study tips for the UPSC prelims.",
+    "What were the main causes of the French Revolution?",
+    "Summarize this passage in three bullet points: The Indian monsoon is driven by the seasonal "
+    "reversal of winds. In summer the land heats faster than the ocean, creating low pressure over "
+    "the subcontinent that draws in moist south-west winds from the Indian Ocean. These winds bring "
+    "most of the country's annual rainfall between June and September.",
+    "Rewrite this sentence with correct grammar: 'Each of the students have submitted there assignment "
+    "before the deadline, but the teacher have not checked them yet.'",
+    "Solve step by step: a train travels 240 km in 3 hours. What is its average speed in m/s?",
+]
+
+
+def run_prompt(llm, prompt, max_tokens):
+    """One chat completion; returns (completion tokens, ttft, decode seconds)."""
+    messages = [{"role": "system", "content": PREP_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+    llm.reset()
+    started = time.perf_counter()
+    first = None
+    tokens = 0
+    for chunk in llm.create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=0.0, seed=42, stream=True):
+        if chunk["choices"][0].get("delta", {}).get("content"):
+            if first is None:
+                first = time.perf_counter()
+            tokens += 1
+    ended = time.perf_counter()
+    first = first or ended
+    return tokens, first - started, ended - first
+
+
+def benchmark_mode(model_path, mode, prompts, max_tokens, runs, n_ctx):
+    speculative = dict(configured_speculative(), mode=mode)
+    llm = load_llama(model_path, optimize_for_hardware(model_path), n_ctx=n_ctx, warmup=True, speculative=speculative)
+    if llm is None:
+        return None
+
+    rates, ttfts, total_tokens = [], [], 0
+    for _ in range(runs):
+        for prompt in prompts:
+            tokens, ttft, decode = run_prompt(llm, prompt, max_tokens)
+            total_tokens += tokens
+            ttfts.append(ttft)
+            if tokens > 1 and decode > 0:
+                rates.append((tokens - 1) / decode)  # the first token belongs to prompt processing
+    del llm
+    return {
+        "mode": mode,
+        "tokens": total_tokens,
+        "tokens_per_sec": round(statistics.mean(rates), 2) if rates else 0.0,
+        "tokens_per_sec_median": round(statistics.median(rates), 2) if rates else 0.0,
+        "ttft_ms": round(statistics.mean(ttfts) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_modes = ["off", "prompt_lookup"] + (["draft"] if configured_speculative()["draft_model_path"] else [])
+    parser.add_argument("--model", default=configured_model_path(), help="GGUF file (default: configured model)")
+    parser.add_argument("--modes", nargs="+", choices=SPECULATIVE_MODES, default=default_modes)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=1, help="passes over the prompt set per mode")
+    parser.add_argument("--n-ctx", type=int, default=4096)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"📊 Benchmarking {args.model} on {len(PROMPTS)} prompts x {args.runs} run(s)")
+    results = []
+    for mode in args.modes:
+        print(f"⏳ Mode: {mode}")
+        try:
+            result = benchmark_mode(args.model, mode, PROMPTS, args.max_tokens, args.runs, args.n_ctx)
+        except Exception as e:
+            print(f"❌ Mode {mode} failed: {e}")
+            continue
+        if result:
+            results.append(result)
+
+    baseline = next((r["tokens_per_sec"] for r in results if r["mode"] == "off"), None)
+    print(f"\n{'mode':<15}{'tok/s':>10}{'median':>10}{'ttft ms':>10}{'speedup':>10}")
+    for r in results:
+        speedup = f"{r['tokens_per_sec'] / baseline:.2f}x" if baseline else "-"
+        print(f"{r['mode']:<15}{r['tokens_per_sec']:>10}{r['tokens_per_sec_median']:>10}{r['ttft_ms']:>10}{speedup:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "max_tokens": args.max_tokens, "runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
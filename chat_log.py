@@ -0,0 +1,320 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: the dev server runs a single process
+    fcntl = None
+
+CHAT_LOG_FILE = "chat_logs.jsonl"
+LEGACY_CHAT_LOG_FILE = "chat_logs.json"  # old read-modify-write JSON array
+
+_STOP = object()
+
+
+class ChatLogWriter:
+    """
+    Single background writer for chat logs.
+
+    Requests only enqueue entries; one thread appends them as JSON lines,
+    fsyncs in batches and rotates the file by size or calendar day. When the
+    bounded queue is full new entries are dropped (and counted) rather than
+    blocking the request.
+
+    Several web workers may share the file. Each line goes out in a single
+    os.write on an O_APPEND descriptor, so lines from different processes
+    never interleave. Rotation happens under an exclusive lock on
+    "<path>.lock": the first writer to decide the file is due renames it,
+    and the others find the live path already replaced and just reopen it.
+    """
+
+    def __init__(self, path=CHAT_LOG_FILE, max_queue=10000, fsync_every=100,
+                 fsync_interval=1.0, max_bytes=50 * 1024 * 1024, rotate_daily=True):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._fd = None
+        self._opened_on = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def write(self, entry):
+        """Queue one entry; never blocks the caller."""
+        self.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Flush queued entries and stop the writer thread."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        self._opened_on = datetime.now().date()
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _sync(self):
+        if self._fd is not None:
+            os.fsync(self._fd)
+
+    @contextmanager
+    def _rotation_lock(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _maybe_rotate(self):
+        size = os.fstat(self._fd).st_size
+        too_big = size >= self.max_bytes
+        new_day = self.rotate_daily and datetime.now().date() != self._opened_on
+        if not (too_big or new_day) or size == 0:
+            return
+
+        self._sync()
+        with self._rotation_lock():
+            try:
+                replaced = not os.path.samestat(os.fstat(self._fd), os.stat(self.path))
+            except FileNotFoundError:
+                replaced = True
+            if not replaced:  # nobody else rotated it yet
+                base, ext = os.path.splitext(self.path)
+                os.replace(self.path, f"{base}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}")
+                self.rotations += 1
+            self._close()
+            self._open()
+
+    def _run(self):
+        self._open()
+        pending = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                entry = None
+
+            if entry is _STOP:
+                break
+            if entry is not None:
+                try:
+                    self._maybe_rotate()
+                    os.write(self._fd, (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    self.written += 1
+                    pending += 1
+                except Exception as e:
+                    print(f"❌ Failed to log chat entry: {e}")
+
+            if pending and (pending >= self.fsync_every or time.monotonic() - last_sync >= self.fsync_interval):
+                try:
+                    self._sync()
+                except OSError as e:
+                    print(f"❌ Failed to sync chat log: {e}")
+                pending = 0
+                last_sync = time.monotonic()
+
+        self._sync()
+        self._close()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+
+def log_files(path=CHAT_LOG_FILE):
+    """All JSONL log files, oldest first (rotated files, then the live one)."""
+    base, ext = os.path.splitext(path)
+    files = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+CHAT_INDEX_FILE = "chat_logs_index.sqlite3"
+
+# Entry fields that /api/chats can filter on, mapped to index columns
+FILTER_COLUMNS = ("session_id", "username", "intent", "source")
+
+
+class ChatLogIndex:
+    """
+    SQLite index over the JSONL chat logs for paginated reads.
+
+    Each entry's filterable fields and raw JSON line are stored under an
+    increasing `seq`, which doubles as the pagination cursor. `refresh()`
+    only reads bytes appended since the last run; files are tracked by
+    inode so rotation (a rename) does not re-index anything.
+    """
+
+    def __init__(self, db_path=CHAT_INDEX_FILE, log_path=CHAT_LOG_FILE, legacy_path=LEGACY_CHAT_LOG_FILE):
+        self.db_path = db_path
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    inode INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    offset INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT,
+                    session_id TEXT,
+                    username TEXT,
+                    intent TEXT,
+                    source TEXT,
+                    timestamp TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_session ON entries (session_id, seq);
+                CREATE INDEX IF NOT EXISTS idx_entries_username ON entries (username, seq);
+                CREATE INDEX IF NOT EXISTS idx_entries_intent ON entries (intent, seq);
+                CREATE INDEX IF NOT EXISTS idx_entries_source ON entries (source, seq);
+                CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp);
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _row(entry, line):
+        return (
+            entry.get("id"), entry.get("session_id"), entry.get("username"),
+            entry.get("intent"), entry.get("source"), entry.get("timestamp"), line,
+        )
+
+    def _insert(self, conn, rows):
+        conn.executemany(
+            "INSERT INTO entries (id, session_id, username, intent, source, timestamp, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows,
+        )
+
+    def _index_legacy(self, conn, known):
+        path = self.legacy_path
+        if not path or not os.path.exists(path):
+            return 0
+        stat = os.stat(path)
+        if known.get(stat.st_ino, (None, 0))[1] >= stat.st_size:
+            return 0
+        entries = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            if content.strip():
+                entries = json.loads(content)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Skipping unreadable {path}: {e}")
+        rows = [self._row(e, json.dumps(e, ensure_ascii=False)) for e in entries if isinstance(e, dict)]
+        self._insert(conn, rows)
+        conn.execute("INSERT OR REPLACE INTO files (inode, path, offset) VALUES (?, ?, ?)",
+                     (stat.st_ino, path, stat.st_size))
+        return len(rows)
+
+    def refresh(self):
+        """Index any entries appended since the last refresh. Returns the number added."""
+        added = 0
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")  # one indexer at a time across processes
+            known = {inode: (path, offset) for inode, path, offset in conn.execute("SELECT inode, path, offset FROM files")}
+            added += self._index_legacy(conn, known)
+
+            for log_file in log_files(self.log_path):
+                stat = os.stat(log_file)
+                offset = known.get(stat.st_ino, (None, 0))[1]
+                if offset >= stat.st_size:
+                    if stat.st_ino in known and known[stat.st_ino][0] != log_file:
+                        conn.execute("UPDATE files SET path = ? WHERE inode = ?", (log_file, stat.st_ino))
+                    continue
+
+                rows = []
+                with open(log_file, "rb") as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break  # line still being written; pick it up next time
+                        offset += len(raw)
+                        line = raw.decode("utf-8").strip()
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(entry, dict):
+                            rows.append(self._row(entry, line))
+
+                self._insert(conn, rows)
+                conn.execute("INSERT OR REPLACE INTO files (inode, path, offset) VALUES (?, ?, ?)",
+                             (stat.st_ino, log_file, offset))
+                added += len(rows)
+        return added
+
+    def query(self, filters=None, since=None, until=None, cursor=None, limit=100, newest_first=True):
+        """
+        Returns (raw JSON lines, next_cursor) for one page.
+
+        `filters` maps FILTER_COLUMNS names to exact values; since/until are
+        ISO timestamps. Pass the returned next_cursor back to get the next page.
+        """
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            if column in FILTER_COLUMNS and value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if cursor is not None:
+            clauses.append("seq < ?" if newest_first else "seq > ?")
+            params.append(cursor)
+
+        sql = "SELECT seq, data FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY seq {'DESC' if newest_first else 'ASC'} LIMIT ?"
+        params.append(limit + 1)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [data for _, data in rows[:limit]], next_cursor
@@ -0,0 +1,118 @@
+"""
+Map-reduce flashcard generation for long documents.
+
+The text is split on page/section boundaries into token-bounded chunks,
+each chunk gets its own generation call (a few at a time), and the decks
+are merged in document order with near-duplicate questions removed.
+"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rapidfuzz import fuzz, process
+
+from context_budget import estimate_tokens
+from intent_index import normalize_text
+
+# Page breaks (\f), markdown/numbered headings, then blank lines
+_SECTION_BREAK = re.compile(r"\f|\n(?=#{1,6} |\d+(?:\.\d+)*\.? [A-Z])|\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+CARDS_PER_1K_TOKENS = 6   # deck size scales with the chunk instead of a flat "at least 15"
+MIN_CARDS_PER_CHUNK = 5
+DUPLICATE_SCORE = 90      # rapidfuzz ratio on normalized questions
+
+
+def _pieces(text, max_tokens):
+    """Section-sized pieces, with oversized sections split by sentence and then by words."""
+    for section in _SECTION_BREAK.split(text):
+        section = section.strip()
+        if not section:
+            continue
+        if estimate_tokens(section) <= max_tokens:
+            yield section
+            continue
+        for sentence in _SENTENCE_BREAK.split(section):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            words = sentence.split()
+            step = max(1, int(max_tokens / 1.3))
+            for i in range(0, len(words), step):
+                yield " ".join(words[i:i + step])
+
+
+def split_into_chunks(text, max_tokens=3000):
+    """Packs consecutive sections into chunks of at most `max_tokens` (estimated)."""
+    chunks, current, size = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        tokens = estimate_tokens(piece)
+        if current and size + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def cards_for(chunk):
+    return max(MIN_CARDS_PER_CHUNK, round(estimate_tokens(chunk) / 1000 * CARDS_PER_1K_TOKENS))
+
+
+def deduplicate(cards, question_cutoff=DUPLICATE_SCORE, answer_cutoff=80):
+    """
+    Drops cards that repeat an earlier one; keeps the first. A repeat has a
+    near-identical question *and* a similar answer, so "What is Article 14?"
+    and "What is Article 21?" both survive.
+    """
+    kept, questions, answers = [], [], []
+    for card in cards:
+        question = normalize_text(str(card.get("question", "")))
+        if not question:
+            continue
+        answer = normalize_text(str(card.get("answer", "")))
+        similar = process.extract(question, questions, scorer=fuzz.ratio, score_cutoff=question_cutoff, limit=None)
+        if any(fuzz.ratio(answer, answers[i]) >= answer_cutoff for _, _, i in similar):
+            continue
+        questions.append(question)
+        answers.append(answer)
+        kept.append(card)
+    return kept
+
+
+def generate_chunked(text, generate, max_workers=4, chunk_tokens=3000, progress=None):
+    """
+    Map: generate(chunk, min_cards) for every chunk, at most `max_workers`
+    at a time. Reduce: concatenate in document order and deduplicate.
+
+    `progress(done, total, cards)` is called as chunks finish. Chunks whose
+    generation fails are skipped; returns None only if all of them fail.
+    """
+    chunks = split_into_chunks(text, chunk_tokens)
+    if not chunks:
+        return None
+    logging.info(f"🧩 Generating flashcards from {len(chunks)} chunk(s), {max_workers} at a time")
+
+    results = [None] * len(chunks)
+    done = cards = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(generate, chunk, cards_for(chunk)): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result() or []
+            except Exception as e:
+                logging.error(f"❌ Flashcard generation failed for chunk {i + 1}/{len(chunks)}: {e}")
+            done += 1
+            cards += len(results[i] or [])
+            if progress:
+                progress(done, len(chunks), cards)
+
+    if not any(results):
+        return None
+    merged = [card for chunk_cards in results if chunk_cards for card in chunk_cards if isinstance(card, dict)]
+    deck = deduplicate(merged)
+    logging.info(f"✅ Merged {len(merged)} flashcards into {len(deck)} after removing duplicates")
+    return deck
@@ -0,0 +1,209 @@
+"""
+Content-addressed disk cache for the flashcard pipelines.
+
+Entries are keyed by what was processed (an uploaded file's SHA-256, a
+normalized video id, the extracted text's hash) plus a pipeline version,
+so the same notes uploaded by different students are extracted,
+transcribed and sent to the LLM once. Bumping a version in the caller
+makes old entries unreachable; they age out through LRU eviction.
+
+Values are JSON files under `directory/<kind>/<xx>/<key>.json`. The total
+size is capped at `max_bytes`, evicting least-recently-used entries (file
+mtime is refreshed on every hit, so the order survives restarts).
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+_YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def video_id(url):
+    """
+    Stable id for a video URL: "youtube:<id>" for the usual YouTube URL
+    shapes (watch, youtu.be, shorts, embed, live), otherwise the URL with
+    scheme/host lowercased and the fragment dropped.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+    segments = [s for s in parts.path.split("/") if s]
+
+    candidate = None
+    if host == "youtu.be" and segments:
+        candidate = segments[0]
+    elif host in _YOUTUBE_HOSTS:
+        if segments[:1] == ["watch"]:
+            candidate = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in ("shorts", "embed", "live", "v"):
+            candidate = segments[1]
+    if candidate and _YOUTUBE_ID.match(candidate):
+        return f"youtube:{candidate}"
+
+    return urlunsplit((parts.scheme.lower(), (parts.netloc or "").lower(), parts.path, parts.query, ""))
+
+
+class Incomplete:
+    """
+    A compute() result that is usable now but must not be cached, e.g.
+    PDF text missing the scanned pages whose OCR failed. Caching it would
+    serve the degraded value for that content until eviction.
+    """
+
+    def __init__(self, value, reason=""):
+        self.value = value
+        self.reason = reason
+
+
+class ContentCache:
+    """Size-capped LRU of JSON values on local disk, shared by all workers in the process."""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(*parts):
+        """Cache key from the content id and every version/setting the value depends on."""
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """Rebuilds the LRU order from file mtimes the first time the cache is used."""
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if not name.endswith(".json"):
+                    continue  # in-progress or interrupted write
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._bytes += size
+        if found:
+            logging.info(f"📦 Content cache: {len(found)} entries, {self._bytes / 1e6:.1f} MB in {self.directory}")
+        self._evict()
+
+    def _forget(self, path):
+        self._bytes -= self._entries.pop(path, 0)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            path = next(iter(self._entries))
+            self._forget(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def get(self, kind, key):
+        path = self._path(kind, key)
+        with self._lock:
+            self._load_index()
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)
+            except FileNotFoundError:
+                self._forget(path)  # never cached, or evicted by another process
+                self.misses += 1
+                return None
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"⚠️ Dropping unreadable cache entry {path}: {e}")
+                self._forget(path)
+                self.misses += 1
+                return None
+            if path not in self._entries:
+                self._entries[path] = os.path.getsize(path)  # written by another process
+                self._bytes += self._entries[path]
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return value
+
+    def set(self, kind, key, value):
+        path = self._path(kind, key)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # web workers share the directory
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._forget(path)
+            self._entries[path] = len(data)
+            self._bytes += len(data)
+            self._evict()
+
+    def get_or_compute(self, kind, key, compute):
+        """
+        Cached value, or compute() stored for next time. Empty results
+        (failed extraction or generation, including whitespace-only text
+        such as the page breaks of a PDF with no readable page) are
+        returned but not cached, and so are values compute() wraps in
+        Incomplete. Returns (value, hit).
+        """
+        value = self.get(kind, key)
+        if value is not None:
+            return value, True
+        started = time.time()
+        value = compute()
+        if isinstance(value, Incomplete):
+            logging.warning(f"⚠️ Not caching incomplete {kind} {key[:12]}: {value.reason}")
+            return value.value, False
+        if value and not (isinstance(value, str) and not value.strip()):
+            self.set(kind, key, value)
+            logging.info(f"💾 Cached {kind} {key[:12]} (computed in {time.time() - started:.1f}s)")
+        return value, False
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
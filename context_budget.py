@@ -0,0 +1,137 @@
+import re
+import threading
+from collections import OrderedDict
+
+APPROX_TOKENS_PER_WORD = 1.3  # fallback when no tokenizer is available
+MESSAGE_OVERHEAD = 5          # Llama 3 chat template: role header tokens + <|eot_id|>
+REPLY_OVERHEAD = 5            # <|begin_of_text|> + the assistant header the model replies after
+
+
+def estimate_tokens(text):
+    return int(len(text.split()) * APPROX_TOKENS_PER_WORD) + 1
+
+
+class TokenCounter:
+    """
+    Per-message token counts, computed once per distinct message.
+
+    `tokenize(text)` returns the model's tokens, or None while no tokenizer
+    is available; estimates are used then and not cached, so they are
+    replaced by real counts once the tokenizer loads.
+    """
+
+    def __init__(self, tokenize=None, max_entries=50000):
+        self.tokenize = tokenize
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.estimated = 0
+
+    def text_tokens(self, text):
+        tokens = self.tokenize(text) if self.tokenize else None
+        return None if tokens is None else len(tokens)
+
+    def tokens(self, text):
+        """Uncached token count of a bare string (estimated without a tokenizer)."""
+        n = self.text_tokens(text)
+        return estimate_tokens(text) if n is None else n
+
+    def count(self, message):
+        """Tokens one message takes in the prompt, template overhead included."""
+        key = (message.get("role", ""), message.get("content", ""))
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return self._counts[key]
+
+        n = self.text_tokens(key[1])
+        if n is None:
+            self.estimated += 1
+            return estimate_tokens(key[1]) + MESSAGE_OVERHEAD
+        n += MESSAGE_OVERHEAD
+        with self._lock:
+            self.misses += 1
+            self._counts[key] = n
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return n
+
+    def total(self, messages):
+        return sum(self.count(m) for m in messages) + REPLY_OVERHEAD
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cached_messages": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "estimated": self.estimated,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "tokenizer": self.tokenize is not None,
+        }
+
+
+def _keep_from(turns, counts, budget):
+    """Index of the oldest turn in the longest suffix of `turns` that fits in `budget`."""
+    start = len(turns)
+    while start > 0 and counts[start - 1] <= budget:
+        start -= 1
+        budget -= counts[start]
+    return min(start, len(turns) - 1) if turns else 0  # never drop the newest message
+
+
+def extractive_summary(evicted, counter, max_tokens):
+    """
+    Cheap summary of dropped turns: the opening sentence of each earlier
+    student question, keeping the most recent ones that fit in `max_tokens`.
+    """
+    questions = []
+    header = "Earlier in this conversation the student asked about: "
+    used = MESSAGE_OVERHEAD + counter.tokens(header)
+    for message in reversed(evicted):
+        if message.get("role") != "user":
+            continue
+        first = re.split(r"(?<=[.?!])\s", message.get("content", "").strip(), maxsplit=1)[0][:200]
+        cost = counter.tokens(first) + 1  # "; " separator
+        if not first or used + cost > max_tokens:
+            break
+        questions.append(first)
+        used += cost
+    if not questions:
+        return None
+    return header + "; ".join(reversed(questions))
+
+
+def fit_messages(messages, budget, counter, summarize=None, summary_tokens=150):
+    """
+    Fit `messages` into `budget` prompt tokens.
+
+    Leading system messages are always kept; of the conversation after
+    them, the longest run of most recent messages that fits is kept. With
+    `summarize(evicted, counter, max_tokens)`, `summary_tokens` of the
+    budget is set aside for a system message summarizing what was dropped.
+    Each message is counted once, so this is O(n).
+
+    Returns (messages, evicted).
+    """
+    first_turn = next((i for i, m in enumerate(messages) if m.get("role") != "system"), len(messages))
+    head, turns = messages[:first_turn], messages[first_turn:]
+    counts = [counter.count(m) for m in turns]
+    available = budget - sum(counter.count(m) for m in head) - REPLY_OVERHEAD
+
+    start = _keep_from(turns, counts, available)
+    if start == 0:
+        return list(messages), []
+
+    if summarize:
+        start = max(start, _keep_from(turns, counts, available - summary_tokens))
+        evicted = turns[:start]
+        summary = summarize(evicted, counter, summary_tokens)
+        if summary:
+            head = head + [{"role": "system", "content": summary}]
+        return head + turns[start:], evicted
+
+    return head + turns[start:], turns[:start]
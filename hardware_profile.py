@@ -0,0 +1,185 @@
+"""
+Tuned llama.cpp thread/batch settings, stored per CPU model and model file.
+
+The static tiers in optimize_for_hardware only look at free RAM. Here a few
+n_threads / n_threads_batch / n_batch combinations are timed on the actual
+model, and the fastest is saved to HARDWARE_PROFILE_FILE so every boot
+reuses it. Tuning is an explicit step (boots only tune themselves with
+LLM_AUTOTUNE=startup or force):
+
+    python hardware_profile.py [model.gguf]   # tune now and save
+"""
+import json
+import os
+import platform
+import threading
+import time
+from datetime import datetime
+
+import psutil
+
+HARDWARE_PROFILE_FILE = "hardware_profile.json"  # overridable with the HARDWARE_PROFILE_FILE env var
+
+# A chat-sized prompt: prompt processing is timed on it, then a short decode
+TUNE_PROMPT = (
+    "You are Prep, a helpful AI study mentor. Explain the water cycle to a student preparing for "
+    "a competitive exam. Cover evaporation, condensation, precipitation and collection, give one "
+    "real-world example for each stage, and finish with three quick revision questions. "
+) * 4
+TUNE_DECODE_TOKENS = 32
+
+_lock = threading.Lock()
+
+
+def cpu_model():
+    """Human-readable CPU name, used in the profile key."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine() or "unknown-cpu"
+
+
+def profile_key(model_path):
+    """CPU model, core counts and model file (name and size) - any change means re-tuning."""
+    physical = psutil.cpu_count(logical=False) or psutil.cpu_count()
+    size = os.path.getsize(model_path) if os.path.exists(model_path) else 0
+    return f"{cpu_model()}|{physical}c/{psutil.cpu_count()}t|{os.path.basename(model_path)}|{size}"
+
+
+def _profile_path(path):
+    return path or os.getenv("HARDWARE_PROFILE_FILE", HARDWARE_PROFILE_FILE)
+
+
+def _read_profiles(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Ignoring unreadable hardware profile file {path}: {e}")
+        return {}
+
+
+def load_profile(model_path, path=None):
+    """The saved profile for this CPU and model file, or None."""
+    return _read_profiles(_profile_path(path)).get(profile_key(model_path))
+
+
+def save_profile(model_path, profile, path=None):
+    path = _profile_path(path)
+    with _lock:
+        profiles = _read_profiles(path)
+        profiles[profile_key(model_path)] = profile
+        # Unique per process and thread: the lock does not cover other processes
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def thread_candidates():
+    """A few thread counts around the physical core count (decode is memory-bound, so more isn't always faster)."""
+    physical = psutil.cpu_count(logical=False) or psutil.cpu_count() or 1
+    logical = psutil.cpu_count() or physical
+    options = {max(1, physical // 4), max(1, physical // 2), max(1, physical * 3 // 4), physical, logical}
+    return sorted(options)
+
+
+def _time_run(model_path, settings, n_ctx):
+    """Prompt-processing and decode tokens/sec with these settings."""
+    from llama_cpp import Llama
+
+    llm = Llama(
+        model_path=model_path,
+        n_ctx=n_ctx,
+        n_threads=settings["n_threads"],
+        n_threads_batch=settings["n_threads_batch"],
+        n_batch=settings["n_batch"],
+        n_gpu_layers=settings.get("n_gpu_layers", 0),
+        use_mmap=True,
+        verbose=False,
+    )
+    try:
+        tokens = llm.tokenize(TUNE_PROMPT.encode("utf-8"))
+        started = time.perf_counter()
+        first = None
+        decoded = 0
+        for _ in llm.generate(tokens, temp=0.0, top_k=1, reset=True):
+            if first is None:
+                first = time.perf_counter()  # prompt evaluated, first token sampled
+            decoded += 1
+            if decoded > TUNE_DECODE_TOKENS:
+                break
+        ended = time.perf_counter()
+        return {
+            "prompt_tokens_per_sec": len(tokens) / (first - started),
+            "decode_tokens_per_sec": (decoded - 1) / (ended - first) if decoded > 1 else 0.0,
+        }
+    finally:
+        del llm
+
+
+def autotune(model_path, base_settings, n_ctx=2048, path=None):
+    """
+    Time thread and batch combinations on `model_path` and save the best.
+
+    Decode speed depends on n_threads, prompt processing on n_threads_batch
+    and n_batch, so they are tuned one after the other: first n_threads by
+    decode tokens/sec, then n_threads_batch x n_batch by prompt tokens/sec.
+    Returns the tuned settings (base_settings with the winners filled in).
+    """
+    print(f"🔧 Autotuning llama.cpp threads/batch for {os.path.basename(model_path)} on {cpu_model()}...")
+    started = time.time()
+    settings = dict(base_settings, n_batch=512)
+    settings["n_threads_batch"] = settings["n_threads"]
+    trials = []
+    _time_run(model_path, settings, n_ctx)  # untimed pass so every trial sees the weights in page cache
+
+    best_decode = 0.0
+    for n_threads in thread_candidates():
+        candidate = dict(settings, n_threads=n_threads, n_threads_batch=n_threads)
+        result = _time_run(model_path, candidate, n_ctx)
+        trials.append({"n_threads": n_threads, "n_threads_batch": n_threads, "n_batch": 512, **result})
+        print(f"   n_threads={n_threads}: {result['decode_tokens_per_sec']:.1f} tok/s decode")
+        if result["decode_tokens_per_sec"] > best_decode:
+            best_decode = result["decode_tokens_per_sec"]
+            settings["n_threads"] = n_threads
+
+    best_prompt = 0.0
+    for n_threads_batch in sorted({settings["n_threads"], psutil.cpu_count(logical=False) or settings["n_threads"], psutil.cpu_count()}):
+        for n_batch in (128, 256, 512):
+            candidate = dict(settings, n_threads_batch=n_threads_batch, n_batch=n_batch)
+            result = _time_run(model_path, candidate, n_ctx)
+            trials.append({"n_threads": settings["n_threads"], "n_threads_batch": n_threads_batch, "n_batch": n_batch, **result})
+            print(f"   n_threads_batch={n_threads_batch} n_batch={n_batch}: {result['prompt_tokens_per_sec']:.1f} tok/s prompt")
+            if result["prompt_tokens_per_sec"] > best_prompt:
+                best_prompt = result["prompt_tokens_per_sec"]
+                settings["n_threads_batch"], settings["n_batch"] = n_threads_batch, n_batch
+
+    profile = {
+        "key": profile_key(model_path),
+        "settings": settings,
+        "decode_tokens_per_sec": round(best_decode, 2),
+        "prompt_tokens_per_sec": round(best_prompt, 2),
+        "trials": trials,
+        "tuned_at": datetime.now().isoformat(),
+        "tuning_time": round(time.time() - started, 1),
+    }
+    save_profile(model_path, profile, path)
+    print(f"✅ Hardware profile saved ({profile['tuning_time']}s): {settings}")
+    return settings
+
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    from llm_engine import configured_model_path, optimize_for_hardware
+
+    load_dotenv()
+    target = sys.argv[1] if len(sys.argv) > 1 else configured_model_path()
+    autotune(target, optimize_for_hardware())
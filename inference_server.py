@@ -0,0 +1,102 @@
+"""
+Dedicated LLaMA inference process.
+
+Loads a pool of Llama contexts over one mmap'd GGUF file and serves chat
+completions to web workers over a local socket, so gunicorn workers can run
+with LLM_MODE=remote and never load the model themselves.
+
+Connections are authenticated with LLM_SERVER_AUTHKEY, which must be set
+(to the same secret) here and in the web workers: the socket exchanges
+pickled messages, so anyone holding the key can run code in this process.
+
+    LLM_SERVER_AUTHKEY=... LLM_POOL_SIZE=2 python inference_server.py
+"""
+import os
+import threading
+from multiprocessing.connection import Listener
+from dotenv import load_dotenv
+
+from llm_engine import (
+    InferenceScheduler, ModelHandle, SchedulerBusy, PREP_SYSTEM_PROMPT, load_model_pool, optimize_for_hardware,
+    configured_model_path, configured_speculative,
+)
+
+load_dotenv()
+
+LLAMA_MODEL_PATH = configured_model_path()
+LLM_SPECULATIVE = configured_speculative()
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "1"))
+LLAMA_N_CTX = int(os.getenv("LLAMA_N_CTX", "4096"))  # must match the web side, which budgets prompts with it
+LLM_SERVER_ADDRESS = os.getenv("LLM_SERVER_ADDRESS", "127.0.0.1:5055")
+LLM_SERVER_AUTHKEY = os.getenv("LLM_SERVER_AUTHKEY")
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+
+
+def handle_connection(conn, scheduler):
+    """Serve one request: a stats query or a streamed chat completion."""
+    try:
+        request = conn.recv()
+        if request.get("op") == "stats":
+            conn.send(scheduler.stats())
+            return
+
+        try:
+            job = scheduler.submit(
+                request["messages"], priority=request.get("priority", 0), deadline=request.get("deadline"),
+                **request.get("params", {}),
+            )
+        except SchedulerBusy as e:
+            conn.send(("busy", e.retry_after))
+            return
+
+        conn.send(("accepted", job.id))
+        try:
+            for token in job.stream():
+                conn.send(("token", token))
+        except (EOFError, OSError):
+            job.cancel("client_disconnected")  # web worker gave up on this request
+            raise
+        conn.send(("meta", {"wait_time": job.wait_time, "completion_tokens": job.completion_tokens}))
+        if job.error:
+            conn.send(("error", job.error))
+        else:
+            conn.send(("done", job.finish_reason))
+    except (EOFError, OSError) as e:
+        print(f"⚠️ Client connection dropped: {e}")
+    finally:
+        conn.close()
+
+
+def main():
+    if not LLM_SERVER_AUTHKEY:
+        raise SystemExit("❌ LLM_SERVER_AUTHKEY is not set; refusing to start the inference server without a secret.")
+
+    model = ModelHandle(
+        "llama",
+        lambda: load_model_pool(
+            LLAMA_MODEL_PATH, optimize_for_hardware(LLAMA_MODEL_PATH), size=LLM_POOL_SIZE, n_ctx=LLAMA_N_CTX, warmup=False,
+            speculative=LLM_SPECULATIVE,
+        ),
+    )
+    pool = model.get()  # load eagerly: this process exists to serve the model
+    if not pool:
+        raise SystemExit("❌ No LLaMA context could be loaded, inference server not started.")
+    scheduler = InferenceScheduler(
+        model, max_queue=INFERENCE_QUEUE_SIZE, prefix_messages=[{"role": "system", "content": PREP_SYSTEM_PROMPT}],
+    )
+    scheduler.start()
+
+    host, port = LLM_SERVER_ADDRESS.rsplit(":", 1)
+    with Listener((host, int(port)), authkey=LLM_SERVER_AUTHKEY.encode()) as listener:
+        print(f"✅ Inference server listening on {LLM_SERVER_ADDRESS} with {len(pool)} context(s), n_ctx={LLAMA_N_CTX}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"⚠️ Rejected connection: {e}")
+                continue
+            threading.Thread(target=handle_connection, args=(conn, scheduler), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text the same way for patterns and user input.
+
+    Lowercases, strips punctuation and sorts the tokens, so a plain
+    `fuzz.ratio` on two normalized strings equals `fuzz.token_sort_ratio`
+    on the cleaned originals.
+    """
+    return " ".join(sorted(utils.default_process(text or "").split()))
+
+
+def sort_tokens(text: str) -> str:
+    """
+    Sorts the whitespace tokens and nothing else, so `fuzz.ratio` on two
+    keys equals `fuzz.token_sort_ratio` on the originals, the scorer the
+    intent thresholds were tuned for (case and punctuation still count).
+    """
+    return " ".join(sorted((text or "").split()))
+
+
+class IntentIndex:
+    """
+    Flattened, pre-normalized view of the intents dataset.
+
+    Built once per dataset load. Every pattern position maps straight to
+    its intent, so a lookup is a single scored search with no rebuilding.
+    Patterns and queries are scored as `fuzz.ratio` on `normalize(text)`
+    keys; the default, `sort_tokens`, scores exactly like the original
+    `token_sort_ratio` matcher.
+
+    Two match modes are supported:
+    - "exhaustive": score every pattern with rapidfuzz.
+    - "prefilter": narrow to the top-K patterns sharing the most (IDF
+      weighted) tokens with the query through an inverted index, then
+      rescore only those. Falls back to exhaustive when no candidate
+      clears the threshold, so misspelt queries still match. The index
+      uses lowercased, punctuation-free tokens whatever `normalize` is.
+    """
+
+    MODES = ("exhaustive", "prefilter")
+
+    def __init__(self, intents, normalize=sort_tokens):
+        self.intents = intents
+        self.normalize = normalize
+        self.patterns = []  # original pattern text
+        self.keys = []      # normalize(pattern), the text that is scored
+        self.owners = []    # intent dict for each pattern position
+
+        for intent in intents:
+            for p in intent.get("patterns", []):
+                key = normalize(p)
+                if not key:
+                    continue
+                self.patterns.append(p)
+                self.keys.append(key)
+                self.owners.append(intent)
+
+        # Inverted index: token -> pattern positions, weighted by rarity
+        postings = defaultdict(list)
+        for position, pattern in enumerate(self.patterns):
+            for token in set(normalize_text(pattern).split()):
+                postings[token].append(position)
+        total = len(self.keys)
+        self.postings = {t: tuple(p) for t, p in postings.items()}
+        self.idf = {t: math.log(1 + total / len(p)) for t, p in postings.items()}
+
+        # Snapshots are shared across request threads, so freeze the lookup tables
+        self.patterns = tuple(self.patterns)
+        self.keys = tuple(self.keys)
+        self.owners = tuple(self.owners)
+
+    def candidates(self, user_input, top_k):
+        """Positions of the top_k patterns sharing the most weighted tokens with the query."""
+        weights = defaultdict(float)
+        for token in set(normalize_text(user_input).split()):
+            for position in self.postings.get(token, ()):
+                weights[position] += self.idf[token]
+        if len(weights) <= top_k:
+            return list(weights)
+        return heapq.nlargest(top_k, weights, key=weights.get)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def match(self, user_input, threshold=70, mode="exhaustive", top_k=50):
+        """Returns (intent, score, pattern) for the best match, or (None, score, None)."""
+        if not self.keys:
+            return None, 0.0, None
+
+        query = self.normalize(user_input)
+        result = None
+        if mode == "prefilter" and top_k < len(self.keys):
+            positions = self.candidates(user_input, top_k)
+            if positions:
+                result = process.extractOne(query, {p: self.keys[p] for p in positions}, scorer=fuzz.ratio, processor=None)
+                if result is not None and result[1] < threshold:
+                    result = None  # a pattern outside the candidates may still clear it
+        if result is None:
+            result = process.extractOne(query, self.keys, scorer=fuzz.ratio, processor=None)
+        if result is None:
+            return None, 0.0, None
+
+        _, score, position = result
+        if score >= threshold:
+            return self.owners[position], score, self.patterns[position]
+        return None, score, self.patterns[position]
+
+    def classify_batch(self, utterances, threshold=70, workers=-1, chunk_size=1024):
+        """
+        Scores many utterances at once with a rapidfuzz `cdist` matrix.
+
+        Rows are processed in chunks to bound memory; `workers=-1` uses all
+        cores. Returns one dict per utterance with tag, score and pattern.
+        """
+        results = []
+        if not self.keys:
+            return [{"tag": None, "score": 0.0, "pattern": None} for _ in utterances]
+
+        queries = [self.normalize(u) for u in utterances]
+        for start in range(0, len(queries), chunk_size):
+            scores = process.cdist(
+                queries[start:start + chunk_size], self.keys,
+                scorer=fuzz.ratio, processor=None, workers=workers, dtype=np.float64,
+            )
+            best = np.argmax(scores, axis=1)
+            for row, position in enumerate(best):
+                score = float(scores[row, position])
+                results.append({
+                    "tag": self.owners[position]["tag"] if score >= threshold else None,
+                    "score": score,
+                    "pattern": self.patterns[position],
+                })
+        return results
+
+
+def validate_intents(data):
+    """Checks the chats_dataset.json structure and returns the intents list."""
+    if not isinstance(data, dict) or not isinstance(data.get("intents"), list):
+        raise ValueError("dataset must be an object with an 'intents' list")
+
+    for i, intent in enumerate(data["intents"]):
+        if not isinstance(intent, dict):
+            raise ValueError(f"intent #{i} is not an object")
+        if not isinstance(intent.get("tag"), str) or not intent["tag"]:
+            raise ValueError(f"intent #{i} has no 'tag'")
+        for field in ("patterns", "responses"):
+            values = intent.get(field, [])
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"intent '{intent['tag']}' has an invalid '{field}' list")
+    return data["intents"]
+
+
+def parse_classify_request(data, max_batch):
+    """
+    Checks a /api/intents/classify body and returns (utterances, threshold).
+    Raises ValueError with the message for the 400 response.
+    """
+    utterances = data.get("utterances") if isinstance(data, dict) else None
+    if not isinstance(utterances, list) or not all(isinstance(u, str) for u in utterances):
+        raise ValueError("Request body must include 'utterances' as a list of strings.")
+    if len(utterances) > max_batch:
+        raise ValueError(f"At most {max_batch} utterances per request.")
+
+    raw_threshold = data.get("threshold", 70)
+    try:
+        if isinstance(raw_threshold, bool):
+            raise ValueError
+        threshold = float(raw_threshold)
+        if not 0 <= threshold <= 100:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("'threshold' must be a number between 0 and 100.") from None
+    return utterances, threshold
+
+
+@dataclass(frozen=True)
+class IntentSnapshot:
+    """One immutable, versioned load of the intents dataset."""
+    version: int
+    loaded_at: datetime
+    mtime: float
+    index: IntentIndex
+
+
+class IntentRegistry:
+    """
+    Holds the current intent snapshot and hot-reloads it from disk.
+
+    A background thread polls the file's mtime; a changed file is parsed,
+    validated and indexed off the request path, then swapped in with a
+    single reference assignment. A bad file keeps the previous snapshot.
+    """
+
+    def __init__(self, path, poll_interval=5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.last_error = None
+        self._failed_mtime = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._snapshot = IntentSnapshot(0, datetime.now(), 0.0, IntentIndex([]))
+        self.reload()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def reload(self, force=False):
+        """Loads the file if its mtime changed. Returns True if a new snapshot was swapped in."""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                self.last_error = str(e)
+                return False
+            if not force and mtime in (self._snapshot.mtime, self._failed_mtime):
+                return False
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    intents = validate_intents(json.load(f))
+                index = IntentIndex(intents)
+            except Exception as e:
+                self.last_error = str(e)
+                self._failed_mtime = mtime
+                print(f"❌ Failed to load {self.path}: {e}")
+                return False
+
+            self.last_error = None
+            self._failed_mtime = None
+            self._snapshot = IntentSnapshot(self._snapshot.version + 1, datetime.now(), mtime, index)
+            print(f"✅ {self.path} loaded (version {self._snapshot.version}, {len(index)} patterns)")
+            return True
+
+    def start(self):
+        """Starts the background mtime watcher (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.reload()
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat(),
+            "intents": len(snapshot.index.intents),
+            "patterns": len(snapshot.index),
+            "last_error": self.last_error,
+        }
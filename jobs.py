@@ -0,0 +1,328 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+
+import psutil
+
+INTERRUPTED = "Interrupted by a server restart; please submit it again."
+
+
+class JobRejected(Exception):
+    """Raised by JobManager.submit when the queue or the user's quota is full."""
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One background pipeline run.
+
+    The pipeline reports progress through `update(stage, progress, **partial)`;
+    `partial` results (e.g. extracted text length, a transcript preview) are
+    visible while it is still running. Its return value becomes `result`.
+    """
+
+    QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+    def __init__(self, owner, kind, on_change=None):
+        self.id = str(uuid.uuid4())
+        self.owner = owner
+        self.kind = kind
+        self.status = self.QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._on_change = on_change  # JobManager hook that persists the new state
+
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def update(self, stage=None, progress=None, **partial):
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            if progress is not None:
+                self.progress = round(min(max(progress, 0.0), 1.0), 3)
+            self.partial.update(partial)
+        if self._on_change:
+            self._on_change(self)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "partial": dict(self.partial),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    @classmethod
+    def from_dict(cls, owner, data):
+        """Read-only copy of a job stored by some other process."""
+        job = cls(owner, data["kind"])
+        for name, value in data.items():
+            setattr(job, name, value)
+        return job
+
+
+def _process_token(pid=None):
+    """pid plus start time, so a reused pid is not mistaken for the original process."""
+    try:
+        process = psutil.Process(pid)
+        return f"{process.pid}:{process.create_time()}"
+    except psutil.Error:
+        return None
+
+
+def _process_alive(token):
+    pid = int(token.split(":", 1)[0])
+    return _process_token(pid) == token
+
+
+class JobStore:
+    """
+    SQLite copy of every job's state, so a poll that reaches another web
+    worker (or comes after a restart) still finds the job.
+
+    Each row records the process running the job. Queued or running jobs
+    whose process is gone are reported as failed; their queue lived in that
+    process's memory.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.process = _process_token()
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    process TEXT NOT NULL,
+                    finished_at REAL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+            """)
+            self._fail_orphans(conn)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _fail_orphans(self, conn, owner=None):
+        query = "SELECT id, process, data FROM jobs WHERE status IN (?, ?)"
+        params = [Job.QUEUED, Job.RUNNING]
+        if owner is not None:
+            query += " AND owner = ?"
+            params.append(owner)
+        for job_id, process, data in conn.execute(query, params).fetchall():
+            if process == self.process or _process_alive(process):
+                continue
+            data = json.loads(data)
+            data.update(status=Job.FAILED, error=INTERRUPTED, finished_at=time.time())
+            conn.execute("UPDATE jobs SET status = ?, finished_at = ?, data = ? WHERE id = ?",
+                         (Job.FAILED, data["finished_at"], json.dumps(data), job_id))
+            logging.warning(f"⚠️ {data['kind']} job {job_id} was interrupted by a restart")
+
+    def save(self, job):
+        data = job.to_dict()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, owner, status, process, finished_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.owner, data["status"], self.process, data["finished_at"], json.dumps(data)),
+            )
+
+    def load(self, job_id):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT owner, process, status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row[2] in (Job.QUEUED, Job.RUNNING):
+                self._fail_orphans(conn, owner=row[0])
+            owner, data = conn.execute("SELECT owner, data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_dict(owner, json.loads(data))
+
+    def active_for(self, owner):
+        with closing(self._connect()) as conn, conn:
+            self._fail_orphans(conn, owner=owner)
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE owner = ? AND status IN (?, ?)",
+                                (owner, Job.QUEUED, Job.RUNNING)).fetchone()[0]
+
+    def prune(self, cutoff, history):
+        """Drop finished jobs older than `cutoff`, and all but the newest `history` finished ones."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+            conn.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE finished_at IS NOT NULL "
+                "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)", (history,),
+            )
+
+
+class JobManager:
+    """
+    Bounded worker pool for slow pipelines (OCR, downloads, transcription,
+    LLM calls) so they run off the request thread.
+
+    `submit` returns immediately with a Job to poll. It raises JobRejected
+    when `max_queue` jobs are already waiting or the owner already has
+    `per_user` jobs queued or running. Finished jobs are kept for
+    `retention` seconds (at most `history` of them) so clients can collect
+    the result.
+
+    With `db_path`, job state is also kept in a JobStore: polls answered by
+    other processes read it from there, and the per-user limit counts jobs
+    queued in every process.
+    """
+
+    def __init__(self, workers=2, max_queue=20, per_user=2, retention=3600, history=500, db_path=None):
+        self.workers = workers
+        self.per_user = per_user
+        self.retention = retention
+        self.history = history
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()  # id -> Job, oldest first
+        self._lock = threading.Lock()
+        self._threads = []
+        self.store = JobStore(db_path) if db_path else None
+        self._store_lock = threading.Lock()  # a job's rows are written in the order its state changed
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _active_for(self, owner):
+        if self.store:
+            return self.store.active_for(owner)
+        return sum(1 for job in self._jobs.values() if job.owner == owner and not job.finished)
+
+    def _persist(self, job):
+        if not self.store:
+            return
+        try:
+            with self._store_lock:
+                self.store.save(job)
+        except sqlite3.Error as e:
+            logging.warning(f"⚠️ Could not persist job {job.id}: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(self._jobs) - self.history
+        for job in finished:
+            if job.finished_at < cutoff or excess > 0:
+                del self._jobs[job.id]
+                excess -= 1
+        if self.store:
+            self.store.prune(cutoff, self.history)
+
+    def submit(self, owner, kind, fn, *args, cleanup=None):
+        """
+        Queue fn(job, *args). `cleanup()` (e.g. deleting an uploaded file)
+        runs after the job finishes, or right away if it is rejected.
+        """
+        job = Job(owner, kind, on_change=self._persist)
+        with self._lock:
+            self._prune()
+            if self._active_for(owner) >= self.per_user:
+                self.rejected += 1
+                rejection = JobRejected(f"You already have {self.per_user} generation job(s) in progress.", retry_after=10)
+            else:
+                try:
+                    self._queue.put_nowait((job, fn, args, cleanup))
+                    self._jobs[job.id] = job
+                    self._persist(job)
+                    rejection = None
+                except queue.Full:
+                    self.rejected += 1
+                    rejection = JobRejected("The server is busy with other generation jobs. Please try again shortly.", retry_after=30)
+        if rejection:
+            if cleanup:
+                cleanup()
+            raise rejection
+        self.start()
+        logging.info(f"📥 Queued {kind} job {job.id} for user {owner}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            job = self.store.load(job_id)
+        return job
+
+    def _run(self):
+        while True:
+            job, fn, args, cleanup = self._queue.get()
+            job.status = Job.RUNNING
+            job.started_at = time.time()
+            self._persist(job)
+            result, error = None, None
+            try:
+                result = fn(job, *args)
+            except Exception as e:
+                error = str(e)
+            if cleanup:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logging.warning(f"⚠️ Cleanup after job {job.id} failed: {e}")
+
+            job.finished_at = time.time()  # set before the status so pruning never sees a finished job without it
+            job.result, job.error = result, error
+            with self._lock:
+                if error is None:
+                    job.progress = 1.0
+                    job.status = Job.SUCCEEDED
+                    self.completed += 1
+                else:
+                    job.status = Job.FAILED
+                    self.failed += 1
+            self._persist(job)
+            if error is None:
+                logging.info(f"✅ {job.kind} job {job.id} finished in {job.finished_at - job.started_at:.1f}s")
+            else:
+                logging.error(f"❌ {job.kind} job {job.id} failed: {error}")
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == Job.RUNNING)
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "per_user_limit": self.per_user,
+            }
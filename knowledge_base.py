@@ -0,0 +1,115 @@
+import json
+import re
+import threading
+from rapidfuzz import fuzz
+from intent_index import IntentIndex, normalize_text
+
+# Words that carry no meaning for "is this the same question?" checks
+STOPWORDS = {
+    "what", "which", "who", "whom", "when", "where", "why", "how", "the", "and",
+    "are", "was", "were", "is", "a", "an", "of", "in", "on", "to", "for", "me",
+    "tell", "can", "you", "your", "please", "explain", "give", "about", "there",
+    "this", "that", "with", "from", "does", "did", "do",
+}
+
+
+def content_tokens(normalized: str) -> set:
+    return {t for t in normalized.split() if len(t) > 1 and t not in STOPWORDS}
+
+
+def proper_tokens(text: str) -> set:
+    """Normalized capitalized words after the first one ("capital of India" -> {"india"})."""
+    words = re.findall(r"[^\W\d_][\w'-]*", text or "")
+    return set(normalize_text(" ".join(w for w in words[1:] if w[0].isupper())).split())
+
+
+def is_typo(a: str, b: str, cutoff: float) -> bool:
+    """
+    True if `a` and `b` look like the same word mistyped: same first letter,
+    lengths within one, neither a prefix of the other, and a rapidfuzz ratio
+    of at least `cutoff`. "capitol"/"capital" pass; "india"/"indiana" and
+    "russia"/"prussia" don't.
+    """
+    if min(len(a), len(b)) < 4 or a[0] != b[0] or abs(len(a) - len(b)) > 1:
+        return False
+    if a.startswith(b) or b.startswith(a):
+        return False
+    return fuzz.ratio(a, b) >= cutoff
+
+
+class KnowledgeBase:
+    """
+    Indexed question/answer lookup over knowledge.json.
+
+    Questions are indexed once through IntentIndex (normalized tokens plus
+    fuzzy rescoring). A hit must clear the score threshold *and* match every
+    content word on both sides, so "capital of iran" never answers
+    "capital of india". Content words may differ only by a typo, and
+    capitalized words (names, places) must match exactly, so "Indiana"
+    never answers "India". Tracks lookups and hits so the share of traffic
+    kept away from the LLM can be reported.
+    """
+
+    def __init__(self, path, threshold=70, token_match=85):
+        self.path = path
+        self.threshold = threshold
+        self.token_match = token_match
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            entries = [e for e in entries if e.get("question") and e.get("answer")]
+            print(f"✅ {path} loaded with {len(entries)} entries")
+        except Exception as e:
+            print(f"❌ Failed to load {path}: {e}")
+            entries = []
+
+        # One "intent" per entry so every question position maps straight to its answer
+        self.index = IntentIndex([
+            {"tag": "knowledge", "patterns": [e["question"]], "responses": [e["answer"]]}
+            for e in entries
+        ], normalize=normalize_text)  # questions are matched case- and punctuation-insensitively
+
+    def __len__(self):
+        return len(self.index)
+
+    def _covers(self, query, pattern):
+        """True if the content words of query and stored question match both ways (up to typos)."""
+        query_tokens = content_tokens(normalize_text(query))
+        pattern_tokens = content_tokens(normalize_text(pattern))
+        exact = proper_tokens(query) | proper_tokens(pattern)
+
+        def matches(t, o):
+            return t == o or (t not in exact and o not in exact and is_typo(t, o, self.token_match))
+
+        def covered(tokens, others):
+            return all(any(matches(t, o) for o in others) for t in tokens)
+
+        return covered(query_tokens, pattern_tokens) and covered(pattern_tokens, query_tokens)
+
+    def lookup(self, user_input):
+        """Returns (answer, score) on a confident hit, else (None, score)."""
+        entry, score, pattern = self.index.match(user_input, self.threshold, mode="prefilter", top_k=20)
+        hit = entry is not None and self._covers(user_input, pattern)
+
+        with self._lock:
+            self.lookups += 1
+            if hit:
+                self.hits += 1
+
+        if hit:
+            return entry["responses"][0], score
+        return None, score
+
+    def stats(self):
+        with self._lock:
+            lookups, hits = self.lookups, self.hits
+        return {
+            "entries": len(self),
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,705 @@
+import itertools
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from multiprocessing.connection import Client
+import psutil  # For system monitoring
+from hardware_profile import load_profile, autotune as autotune_hardware
+
+PRIORITY_INTERACTIVE = 0   # chat requests a user is waiting on
+PRIORITY_BACKGROUND = 10   # anything that can wait behind them
+
+# Shared system prompt. It must not contain anything per-user, so every chat
+# request starts with the same tokens and the evaluated prefix can be reused.
+# Per-user details go in a second system message after it.
+PREP_SYSTEM_PROMPT = """
+You are Prep, a helpful AI study mentor. Your identity and purpose are as follows:
+- **Name:** Prep
+- **Creator:** You are an AI language model designed by a large company and then fine-tuned by the developers of Prep.
+- **Purpose:** Your primary function is to assist students in their studies. This includes providing explanations, summarizing topics, answering questions, and offering study tips.
+
+Your persona should be professional yet approachable. Always refer to yourself as Prep and address the student by name when appropriate.
+
+Provide concise, well-structured responses with clear formatting. Use numbered points, bullet points, and line breaks for readability, especially for complex topics.
+""".strip()
+
+
+def compact_state(state):
+    """
+    Drop all but the last row of a saved state's `scores` (the logits for
+    every evaluated token, n_tokens x n_vocab floats, on top of the KV data).
+    Sampling only reads the last row, and `load_state` broadcasts it back
+    over the rows it restores.
+    """
+    scores = getattr(state, "scores", None)
+    if scores is not None and len(scores) > 1:
+        state.scores = scores[-1:].copy()
+    return state
+
+
+# --- System Performance Monitoring ---
+def get_system_info():
+    """Get current system performance metrics"""
+    cpu_percent = psutil.cpu_percent()
+    memory = psutil.virtual_memory()
+    return {
+        "cpu_usage": cpu_percent,
+        "memory_usage": memory.percent,
+        "available_memory": memory.available // (1024**3),  # GB
+    }
+
+# Settings the autotuner measures; the rest (mlock/mmap) follow available RAM
+TUNED_SETTINGS = ("n_threads", "n_threads_batch", "n_batch")
+
+def optimize_for_hardware(model_path=None, autotune=None):
+    """
+    Auto-detect optimal settings based on hardware.
+
+    With `model_path`, a tuned profile saved for this CPU and model file
+    overrides the thread/batch guesses. LLM_AUTOTUNE (or `autotune`) decides
+    when to tune here: "off" (default) never, "startup" when no profile
+    exists yet, "force" on every call. Tuning loads the model several times
+    and every web worker would do it at once, so the normal way to tune is
+    the explicit `python hardware_profile.py [model.gguf]` step.
+    """
+    settings = _ram_based_settings()
+    if model_path is None:
+        return settings
+
+    profile = load_profile(model_path)
+    mode = autotune or os.getenv("LLM_AUTOTUNE", "off")
+    if mode == "force" or (mode == "startup" and profile is None and os.path.exists(model_path)):
+        try:
+            tuned = autotune_hardware(model_path, settings)
+            return dict(settings, **{k: tuned[k] for k in TUNED_SETTINGS})
+        except Exception as e:
+            print(f"⚠️ Autotuning failed, using default settings: {e}")
+            return settings
+    if profile:
+        print(f"🎯 Using tuned hardware profile from {profile.get('tuned_at')}")
+        return dict(settings, **{k: profile["settings"][k] for k in TUNED_SETTINGS if k in profile["settings"]})
+    return settings
+
+def _ram_based_settings():
+    system = get_system_info()
+    cpu_count = psutil.cpu_count()
+    physical_cores = psutil.cpu_count(logical=False) or cpu_count
+    
+    print(f"🖥️ System Info: CPU Usage: {system['cpu_usage']}%, Memory: {system['memory_usage']}%, Available RAM: {system['available_memory']}GB")
+    
+    # Optimize based on available resources
+    if system['available_memory'] >= 8:  # 8GB+ RAM
+        return {
+            "n_threads": physical_cores,  # hyperthreads slow llama.cpp decode down
+            "n_batch": 512,
+            "n_gpu_layers": 0,  # Increase if you have GPU
+            "use_mlock": True,
+            "use_mmap": True,
+        }
+    elif system['available_memory'] >= 4:  # 4-8GB RAM
+        return {
+            "n_threads": min(cpu_count, 6),
+            "n_batch": 256,
+            "n_gpu_layers": 0,
+            "use_mlock": False,
+            "use_mmap": True,
+        }
+    else:  # Less than 4GB RAM
+        return {
+            "n_threads": min(cpu_count, 4),
+            "n_batch": 128,
+            "n_gpu_layers": 0,
+            "use_mlock": False,
+            "use_mmap": False,
+        }
+
+
+# --- Model selection ---
+DEFAULT_MODEL_DIR = r"C:\Users\kumar\Documents\PREP\backend\models"
+
+def configured_model_path():
+    """
+    GGUF file to serve: LLAMA_MODEL_PATH if set, otherwise
+    LLAMA_MODEL_DIR/LLAMA_MODEL_NAME-LLAMA_MODEL_QUANT.gguf, so a quantized
+    build (e.g. LLAMA_MODEL_QUANT=Q4_K_M) can be picked without a full path.
+    """
+    if os.getenv("LLAMA_MODEL_PATH"):
+        return os.getenv("LLAMA_MODEL_PATH")
+    model_dir = os.getenv("LLAMA_MODEL_DIR", DEFAULT_MODEL_DIR)
+    name = os.getenv("LLAMA_MODEL_NAME", "Llama-3.2-1B-Instruct")
+    quant = os.getenv("LLAMA_MODEL_QUANT", "f16")
+    return os.path.join(model_dir, f"{name}-{quant}.gguf")
+
+
+# --- Speculative decoding ---
+SPECULATIVE_MODES = ("off", "prompt_lookup", "draft")
+
+def configured_speculative():
+    """Speculative decoding settings from LLM_SPECULATIVE (off | prompt_lookup | draft)"""
+    mode = os.getenv("LLM_SPECULATIVE", "off")
+    if mode not in SPECULATIVE_MODES:
+        print(f"⚠️ Unknown LLM_SPECULATIVE={mode!r}, speculative decoding disabled")
+        mode = "off"
+    num_pred_tokens = os.getenv("LLM_SPECULATIVE_TOKENS")
+    return {
+        "mode": mode,
+        "num_pred_tokens": int(num_pred_tokens) if num_pred_tokens else None,
+        "draft_model_path": os.getenv("LLM_DRAFT_MODEL_PATH"),
+    }
+
+
+class DraftModel:
+    """
+    Draft model for llama-cpp-python's speculative decoding: a smaller GGUF
+    with the same vocabulary greedily proposes the next `num_pred_tokens`
+    tokens, which the main model then verifies in one batch. Its context
+    reuses the longest matching prefix between calls, like the main one.
+    """
+
+    def __init__(self, model_path, num_pred_tokens=4, n_ctx=4096, n_threads=None):
+        from llama_cpp import Llama
+
+        self.num_pred_tokens = num_pred_tokens
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, use_mmap=True, verbose=False)
+
+    def __call__(self, input_ids, /, **kwargs):
+        import numpy as np
+
+        draft = []
+        if self.num_pred_tokens > 0:
+            for token in self.llm.generate(list(input_ids), top_k=1, temp=0.0, reset=True):
+                draft.append(token)
+                if len(draft) >= self.num_pred_tokens:
+                    break
+        return np.array(draft, dtype=np.intc)
+
+
+def make_draft_model(speculative, n_ctx=4096, n_threads=None):
+    """Build the per-context draft model for `speculative` settings, or None when off"""
+    if not speculative or speculative.get("mode", "off") == "off":
+        return None
+    num_pred_tokens = speculative.get("num_pred_tokens")
+    if speculative["mode"] == "prompt_lookup":
+        from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+        # Drafts by copying n-grams from the prompt; free, and strong when answers quote the input
+        return LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens or 10)
+
+    draft_path = speculative.get("draft_model_path")
+    if not draft_path or not os.path.exists(draft_path):
+        raise FileNotFoundError(f"Draft model not found at {draft_path}")
+    return DraftModel(draft_path, num_pred_tokens=num_pred_tokens or 4, n_ctx=n_ctx, n_threads=n_threads)
+
+
+def load_llama(model_path, hw_settings, n_ctx=4096, warmup=True, speculative=None):
+    """Load one Llama context with the given hardware settings, or None on failure"""
+    from llama_cpp import Llama  # imported lazily so remote-mode web workers never need it
+
+    try:
+        draft_model = make_draft_model(speculative, n_ctx=n_ctx, n_threads=hw_settings["n_threads"])
+        if draft_model is not None:
+            print(f"🧪 Speculative decoding enabled ({speculative['mode']})")
+        llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,  # Reduced context window for speed
+            n_threads=hw_settings["n_threads"],
+            n_threads_batch=hw_settings.get("n_threads_batch"),
+            n_batch=hw_settings["n_batch"],
+            n_gpu_layers=hw_settings["n_gpu_layers"],
+            use_mlock=hw_settings["use_mlock"],
+            use_mmap=hw_settings["use_mmap"],
+            verbose=False,
+            # Additional performance optimizations
+            f16_kv=True,  # Use half precision for KV cache
+            logits_all=False,  # Don't compute logits for all tokens
+            vocab_only=False,
+            embedding=False,
+            draft_model=draft_model,
+        )
+        print("✅ LLaMA model loaded successfully with optimizations!")
+
+        if warmup:
+            # Warm up the model with a simple prompt
+            print("🔥 Warming up model...")
+            warmup_start = time.time()
+            list(llm.create_completion("Hi", max_tokens=1, stream=True))
+            print(f"✅ Model warmed up in {time.time() - warmup_start:.2f}s")
+        return llm
+    except Exception as e:
+        print(f"❌ FATAL ERROR: Could not load LLaMA model: {e}")
+        return None
+
+
+def load_model_pool(model_path, hw_settings, size=1, n_ctx=4096, warmup=True, speculative=None):
+    """
+    Load `size` Llama contexts over the same GGUF file.
+
+    Weights are mmap'd, so every context (and every process that maps the
+    file) shares one copy through the page cache; only the KV caches are
+    per context. CPU threads are split between the contexts.
+    """
+    print("🔄 Checking LLaMA model path...")
+    if not os.path.exists(model_path):
+        print(f"❌ FATAL ERROR: Model file not found at {model_path}")
+        return []
+
+    settings = dict(hw_settings)
+    if size > 1:
+        settings["use_mmap"] = True
+        settings["n_threads"] = max(1, hw_settings["n_threads"] // size)
+        if hw_settings.get("n_threads_batch"):
+            settings["n_threads_batch"] = max(1, hw_settings["n_threads_batch"] // size)
+    print(f"⏳ Loading {size} LLaMA context(s) with optimized settings: {settings}")
+
+    pool = []
+    for _ in range(size):
+        llm = load_llama(model_path, settings, n_ctx=n_ctx, warmup=warmup, speculative=speculative)
+        if llm is None:
+            break
+        pool.append(llm)
+    return pool
+
+
+def load_tokenizer(model_path):
+    """Load only the vocabulary of a GGUF model (no weights), for counting prompt tokens"""
+    from llama_cpp import Llama
+
+    if not os.path.exists(model_path):
+        print(f"❌ Tokenizer not loaded, model file not found at {model_path}")
+        return None
+    return Llama(model_path=model_path, vocab_only=True, use_mmap=True, verbose=False)
+
+
+# name -> ModelHandle, for the readiness endpoint
+MODELS = {}
+
+
+class ModelHandle:
+    """
+    Lazily loaded heavy model with an observable state.
+
+    `loader()` runs at most once, either on first `get()` (blocking the
+    caller) or in a background thread via `load_async()`. State moves
+    unloaded -> loading -> ready | failed. Handles register themselves in
+    MODELS so readiness can be reported in one place.
+    """
+
+    UNLOADED, LOADING, READY, FAILED = "unloaded", "loading", "ready", "failed"
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = self.UNLOADED
+        self.error = None
+        self.load_time = None
+        self._value = None
+        self._lock = threading.Lock()
+        MODELS[name] = self
+
+    def get(self):
+        """Return the loaded model, loading it now if needed (None if loading failed)."""
+        if self.state == self.READY:
+            return self._value
+        with self._lock:
+            if self.state in (self.UNLOADED, self.LOADING):
+                self.state = self.LOADING
+                print(f"⏳ Loading model '{self.name}'...")
+                started = time.time()
+                try:
+                    self._value = self.loader()
+                    if not self._value:
+                        raise RuntimeError("loader returned nothing")
+                    self.state = self.READY
+                    self.load_time = time.time() - started
+                    print(f"✅ Model '{self.name}' ready in {self.load_time:.2f}s")
+                except Exception as e:
+                    self.state = self.FAILED
+                    self.error = str(e)
+                    print(f"❌ Model '{self.name}' failed to load: {e}")
+            return self._value
+
+    def load_async(self):
+        """Start loading in a background thread (no-op once loading has started)."""
+        if self.state == self.UNLOADED:
+            threading.Thread(target=self.get, daemon=True).start()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_time": round(self.load_time, 2) if self.load_time else None,
+        }
+
+
+class SchedulerBusy(Exception):
+    """Raised when the inference queue is full; carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Inference queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SchedulerUnavailable(Exception):
+    """Raised when the (remote) inference backend cannot be reached."""
+
+
+class InferenceJob:
+    """
+    One queued chat completion.
+
+    The scheduler pushes ("token", text), then a final ("done", finish_reason)
+    or ("error", message) event; the request thread consumes them with
+    `stream()`. After the stream ends `finish_reason`/`error` say how it ended.
+
+    `cancel()` (e.g. on client disconnect) or an expired `deadline` (seconds
+    from submission) stops generation at the next token; the job then ends
+    with the cancel reason, or "deadline", as its finish_reason.
+    """
+
+    def __init__(self, messages, params, priority, kv_state=None, save_state=False, deadline=None):
+        self.id = str(uuid.uuid4())
+        self.messages = messages
+        self.params = params
+        self.priority = priority
+        self.kv_state = kv_state      # llama.cpp state to start from (e.g. the session's last turn)
+        self.save_state = save_state  # capture the state after generating into `saved_state`
+        self.saved_state = None
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.finish_reason = None
+        self.error = None
+        self.completion_tokens = 0
+        self.deadline = self.created_at + deadline if deadline else None
+        self.cancel_reason = None
+        self.closed = False  # the request side has seen the final event
+        self._cancelled = threading.Event()
+        self._events = queue.Queue()
+
+    @property
+    def wait_time(self):
+        return (self.started_at or time.monotonic()) - self.created_at
+
+    def push(self, kind, value):
+        self._events.put((kind, value))
+
+    def cancel(self, reason="cancelled"):
+        """Ask the worker to stop generating; checked between tokens."""
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+        self._cancelled.set()
+
+    def should_stop(self):
+        """Why generation should stop now, or None to keep going."""
+        if self._cancelled.is_set():
+            return self.cancel_reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "deadline"
+        return None
+
+    def stream(self):
+        """Yield generated text until the job finishes."""
+        while True:
+            kind, value = self._events.get()
+            if kind == "token":
+                yield value
+            elif kind == "done":
+                self.finish_reason = value
+                self.closed = True
+                return
+            elif kind == "error":
+                self.error = value
+                self.closed = True
+                return
+
+
+class InferenceScheduler:
+    """
+    Owns the Llama model pool and serialises access to each context.
+
+    Requests submit jobs to a bounded priority queue (lower value first,
+    FIFO within a priority); one worker thread per context runs them and
+    streams tokens back through each job. When the queue is full `submit`
+    raises SchedulerBusy instead of piling more work onto the model.
+
+    `model` is a ModelHandle whose loader returns the list of contexts.
+    Workers start once it is ready, so the first submit may trigger the
+    load and simply wait in the queue for it.
+
+    If `prefix_messages` is given, each context evaluates them once at boot
+    and keeps the llama.cpp state. A job that starts with those messages on
+    a context that currently holds some other prompt gets the state restored
+    first, so only the per-request tail is evaluated. llama.cpp then reuses
+    the longest matching token prefix by itself.
+    """
+
+    def __init__(self, model, max_queue=16, history=200, prefix_messages=None):
+        self.model = model
+        self.prefix_messages = list(prefix_messages or [])
+        self.llms = []
+        self._prefix_states = {}   # id(llm) -> saved state after evaluating the prefix
+        self._holds_prefix = {}    # id(llm) -> whether the context's KV starts with the prefix
+        self._holds_state = {}     # id(llm) -> saved state the context's KV still matches, if any
+        self.prefix_restores = 0
+        self.prefix_reuses = 0
+        self.session_restores = 0
+        self.session_reuses = 0
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=history)
+        self._service_times = deque(maxlen=history)
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = {}        # reason -> jobs stopped early (client gone, deadline passed)
+        self.cancelled_tokens = 0  # tokens generated by those jobs before they stopped
+        self._booted = False
+
+    @property
+    def available(self):
+        return self.model.state != ModelHandle.FAILED
+
+    def start(self):
+        """Load the model pool (in the background) and start one worker per context."""
+        with self._lock:
+            if self._booted:
+                return
+            self._booted = True
+        threading.Thread(target=self._boot, daemon=True).start()
+
+    def _boot(self):
+        self.llms = list(self.model.get() or [])
+        if not self.llms:
+            # New submits are refused via `available`; fail anything that slipped into the queue
+            while True:
+                _, _, job = self._queue.get()
+                job.push("error", "Local model unavailable")
+        for llm in self.llms:
+            self._prime(llm)
+            threading.Thread(target=self._run, args=(llm,), daemon=True).start()
+
+    def _prime(self, llm):
+        """Evaluate the shared prefix once and keep its state (also serves as warmup)."""
+        if not self.prefix_messages:
+            return
+        try:
+            started = time.time()
+            llm.create_chat_completion(messages=self.prefix_messages, max_tokens=1)
+            self._prefix_states[id(llm)] = compact_state(llm.save_state())
+            self._holds_prefix[id(llm)] = True
+            print(f"✅ System prompt prefix cached in {time.time() - started:.2f}s ({llm.n_tokens} tokens)")
+        except Exception as e:
+            print(f"⚠️ Could not cache system prompt prefix: {e}")
+
+    def _uses_prefix(self, job):
+        n = len(self.prefix_messages)
+        return n > 0 and job.messages[:n] == self.prefix_messages
+
+    def _restore_prefix(self, llm, job):
+        """Make sure the context starts with the shared prefix (or the job's own state) before running it."""
+        uses_prefix = self._uses_prefix(job)
+        state = self._prefix_states.get(id(llm))
+        if job.kv_state is not None:
+            if self._holds_state.get(id(llm)) is job.kv_state:
+                self.session_reuses += 1  # nothing ran on this context since the state was saved
+            else:
+                llm.load_state(job.kv_state)
+                self.session_restores += 1
+        elif uses_prefix and state is not None:
+            if self._holds_prefix.get(id(llm)):
+                self.prefix_reuses += 1
+            else:
+                llm.load_state(state)
+                self.prefix_restores += 1
+        self._holds_prefix[id(llm)] = uses_prefix
+        self._holds_state[id(llm)] = None
+
+    def retry_after(self):
+        """Rough seconds until a new job would start, for the Retry-After header."""
+        with self._lock:
+            service = sum(self._service_times) / len(self._service_times) if self._service_times else 5.0
+        return max(1, math.ceil((self._queue.qsize() + self.active) * service / max(1, len(self.llms))))
+
+    def submit(self, messages, priority=PRIORITY_INTERACTIVE, kv_state=None, save_state=False, deadline=None, **params):
+        if not self.available:
+            raise SchedulerUnavailable(f"Model '{self.model.name}' failed to load: {self.model.error}")
+        job = InferenceJob(messages, params, priority, kv_state=kv_state, save_state=save_state, deadline=deadline)
+        try:
+            self._queue.put_nowait((priority, next(self._seq), job))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise SchedulerBusy(self.retry_after())
+        self.start()
+        return job
+
+    def _stopped(self, job, reason):
+        print(f"🛑 Stopped job {job.id} after {job.completion_tokens} token(s): {reason}")
+        with self._lock:
+            self.cancelled[reason] = self.cancelled.get(reason, 0) + 1
+            self.cancelled_tokens += job.completion_tokens
+        job.push("done", reason)
+
+    def _run(self, llm):
+        while True:
+            _, _, job = self._queue.get()
+            reason = job.should_stop()
+            if reason:
+                self._stopped(job, reason)  # abandoned while queued; never touches the model
+                continue
+            job.started_at = time.monotonic()
+            with self._lock:
+                self.active += 1
+                self._waits.append(job.wait_time)
+            try:
+                self._execute(llm, job)
+            finally:
+                job.finished_at = time.monotonic()
+                with self._lock:
+                    self.active -= 1
+                    self._service_times.append(job.finished_at - job.started_at)
+
+    def _execute(self, llm, job):
+        try:
+            self._restore_prefix(llm, job)
+            response_stream = llm.create_chat_completion(messages=job.messages, stream=True, **job.params)
+            finish_reason = None
+            for chunk in response_stream:
+                choice = chunk.get("choices", [{}])[0]
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    job.completion_tokens += 1
+                    job.push("token", content)
+                if choice.get("finish_reason"):
+                    finish_reason = choice["finish_reason"]
+                reason = job.should_stop()
+                if reason:
+                    response_stream.close()  # stops llama.cpp from sampling further tokens
+                    self._stopped(job, reason)
+                    return
+            if job.save_state:
+                job.saved_state = compact_state(llm.save_state())
+                self._holds_state[id(llm)] = job.saved_state
+            job.push("done", finish_reason)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"❌ Error during inference job {job.id}: {e}")
+            job.push("error", str(e))
+            with self._lock:
+                self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "workers": len(self.llms),
+                "model": self.model.status(),
+                "prefix_reuses": self.prefix_reuses,
+                "prefix_restores": self.prefix_restores,
+                "session_restores": self.session_restores,
+                "session_reuses": self.session_reuses,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "cancelled": dict(self.cancelled),
+                "cancelled_tokens": self.cancelled_tokens,
+                "avg_wait": round(sum(waits) / len(waits), 4) if waits else 0.0,
+                "p95_wait": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else 0.0,
+                "avg_service_time": round(sum(self._service_times) / len(self._service_times), 4) if self._service_times else 0.0,
+            }
+
+
+class RemoteJob:
+    """Client-side view of a job running in inference_server.py; same interface as InferenceJob."""
+
+    def __init__(self, conn, job_id):
+        self.id = job_id
+        self.finish_reason = None
+        self.error = None
+        self.wait_time = 0.0
+        self.completion_tokens = 0
+        self.saved_state = None
+        self.closed = False
+        self._conn = conn
+
+    def cancel(self, reason="cancelled"):
+        """Drop the connection; the server cancels the job on its next send."""
+        self._conn.close()
+
+    def stream(self):
+        try:
+            while True:
+                kind, value = self._conn.recv()
+                if kind == "token":
+                    yield value
+                elif kind == "meta":
+                    self.wait_time = value["wait_time"]
+                    self.completion_tokens = value["completion_tokens"]
+                elif kind == "done":
+                    self.finish_reason = value
+                    self.closed = True
+                    return
+                elif kind == "error":
+                    self.error = value
+                    self.closed = True
+                    return
+        except (EOFError, OSError):
+            # The server went away mid-stream; a close from our side (cancel) ends in GeneratorExit instead
+            self.error = "Inference server closed the connection"
+            self.finish_reason = "server_error"
+            self.closed = True
+        finally:
+            self._conn.close()
+
+
+class RemoteScheduler:
+    """
+    Submits jobs to a dedicated inference process over a local socket.
+
+    Lets web workers serve chat without loading the model themselves; the
+    inference process (inference_server.py) owns the pool and the queue.
+    """
+
+    available = True  # the server reports its own model state; failures surface per request
+
+    def __init__(self, address, authkey):
+        if not authkey:
+            # Messages are pickled, so the key is what stops other local processes from talking to the server
+            raise ValueError("LLM_SERVER_AUTHKEY must be set to use the remote inference server")
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.authkey = authkey.encode() if isinstance(authkey, str) else authkey
+
+    def _connect(self):
+        return Client(self.address, authkey=self.authkey)
+
+    def submit(self, messages, priority=PRIORITY_INTERACTIVE, kv_state=None, save_state=False, deadline=None, **params):
+        # KV states stay inside the inference process; only messages cross the socket
+        try:
+            conn = self._connect()
+            conn.send({"op": "submit", "messages": messages, "priority": priority, "deadline": deadline, "params": params})
+            kind, value = conn.recv()
+        except (OSError, EOFError) as e:
+            raise SchedulerUnavailable(f"Inference server unreachable: {e}")
+        if kind == "busy":
+            conn.close()
+            raise SchedulerBusy(value)
+        return RemoteJob(conn, value)
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                conn.send({"op": "stats"})
+                return conn.recv()
+        except (OSError, EOFError) as e:
+            return {"error": f"Inference server unreachable: {e}"}
@@ -0,0 +1,182 @@
+"""
+Tesseract OCR for uploaded pictures and scanned PDF pages.
+
+Each image is downscaled, converted to grayscale and binarized before
+OCR, which is both faster and more accurate on phone photos of notes than
+full-resolution colour input. Images are OCR'd in a pool of spawned
+worker processes (OCR_WORKERS, by default half the cores and at most 4, so
+the web process and the model keep CPU to themselves), and results are
+cached by image hash in a ContentCache. Workers re-import the entry script,
+which is why app.py only builds the app under `__main__`.
+
+Tesseract is found on PATH; set TESSERACT_CMD if it lives elsewhere
+(e.g. C:\\Program Files\\Tesseract-OCR\\tesseract.exe on Windows).
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from PIL import Image, ImageOps
+
+from content_cache import ContentCache
+
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2000"))  # px; about 200 DPI for an A4 page
+
+if os.getenv("TESSERACT_CMD"):
+    pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count():
+    return int(os.getenv("OCR_WORKERS", str(min(4, max(1, (os.cpu_count() or 1) // 2)))))
+
+
+def _init_worker():
+    # One Tesseract thread per process; parallelism comes from the pool
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _get_pool():
+    """Process pool shared by all OCR jobs, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),  # never fork the multithreaded web process
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def otsu_threshold(image):
+    """Otsu's threshold for a grayscale image, from its histogram."""
+    histogram = image.histogram()
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    best, threshold = 0.0, 127
+    for i, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += i * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best:
+            best, threshold = variance, i
+    return threshold
+
+
+def preprocess(image, max_side=OCR_MAX_SIDE):
+    """Upright, flattened onto white, downscaled to `max_side`, grayscale and binarized."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image)
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image = ImageOps.autocontrast(image)
+    threshold = otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0, mode="1")
+
+
+def ocr_bytes(data, lang=OCR_LANG, max_side=OCR_MAX_SIDE):
+    """OCR one encoded image; runs in a worker process."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return pytesseract.image_to_string(preprocess(image, max_side), lang=lang)
+    except pytesseract.TesseractNotFoundError:
+        # Re-raised as a plain error so it pickles back to the parent process
+        raise RuntimeError("Tesseract is not installed or not on PATH (set TESSERACT_CMD).")
+
+
+def ocr_images(images, cache=None, cache_version="", progress=None, total=None):
+    """
+    OCR an iterable of encoded images (bytes); returns their texts in order.
+
+    Images are consumed lazily with at most two per worker in flight, so a
+    generator of rendered PDF pages is never held in memory all at once.
+    Texts found in `cache` (keyed by image SHA-256, `cache_version`, language
+    and size) are returned without OCR. `progress(done, total)` is called as
+    images finish. If the pool breaks, the rest is OCR'd in this process.
+    """
+    texts = {}
+    in_flight = deque()
+    window = _worker_count() * 2
+    done = hits = 0
+    local = _worker_count() <= 1
+
+    def finish(index, key, text):
+        nonlocal done
+        texts[index] = text
+        if cache is not None and text.strip():
+            cache.set("ocr", key, text)
+        done += 1
+        if progress:
+            progress(done, total or done)
+
+    def collect():
+        nonlocal local
+        index, key, data, future = in_flight.popleft()
+        try:
+            text = future.result()
+        except BrokenProcessPool as e:
+            if not local:
+                logging.warning(f"⚠️ OCR pool failed ({e}); continuing in-process")
+                _reset_pool()
+                local = True
+            text = ocr_bytes(data)
+        finish(index, key, text)
+
+    for index, data in enumerate(images):
+        key = ContentCache.key(hashlib.sha256(data).hexdigest(), cache_version, OCR_LANG, OCR_MAX_SIDE)
+        cached = cache.get("ocr", key) if cache is not None else None
+        if cached is not None:
+            hits += 1
+            texts[index] = cached
+            done += 1
+            if progress:
+                progress(done, total or done)
+            continue
+        if local:
+            finish(index, key, ocr_bytes(data))
+            continue
+        try:
+            future = _get_pool().submit(ocr_bytes, data)
+        except BrokenProcessPool:
+            _reset_pool()
+            future = _get_pool().submit(ocr_bytes, data)
+        in_flight.append((index, key, data, future))
+        if len(in_flight) >= window:
+            collect()
+    while in_flight:
+        collect()
+
+    if texts:
+        logging.info(f"✅ OCR finished for {len(texts)} image(s), {hits} from cache")
+    return [texts[i] for i in range(len(texts))]
@@ -0,0 +1,126 @@
+"""
+Page-level PDF text extraction.
+
+Pages are yielded one at a time as (page_number, text), 1-based, so callers
+can report progress and keep page boundaries for chunking. Large documents
+are split into page ranges that a process pool extracts in parallel, each
+worker opening its own fitz document (PyMuPDF documents can't be shared
+across processes). Workers are always spawned, never forked from the
+multithreaded web process; they import this module and the entry script
+(app.py builds the app only under `__main__`), so this module is kept free
+of Flask and model imports.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+
+PAGES_PER_TASK = 25
+MIN_PAGES_FOR_POOL = 40  # below this, process start-up and pickling cost more than they save
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count():
+    return int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def _get_pool():
+    """Process pool shared by all extraction jobs, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def extract_page_range(pdf_path, start, stop):
+    """[(page_number, text)] for pages start..stop-1 (0-based); runs in a worker process."""
+    with fitz.open(pdf_path) as doc:
+        return [(i + 1, doc[i].get_text("text")) for i in range(start, min(stop, doc.page_count))]
+
+
+def iter_pages(pdf_path, start=0, stop=None):
+    """Yields (page_number, text) in order from a single document handle."""
+    with fitz.open(pdf_path) as doc:
+        for i in range(start, doc.page_count if stop is None else min(stop, doc.page_count)):
+            yield i + 1, doc[i].get_text("text")
+
+
+def render_pages(pdf_path, page_numbers, dpi=200):
+    """Yields each listed page (1-based) as a grayscale PNG, for OCR of scanned pages."""
+    with fitz.open(pdf_path) as doc:
+        for number in page_numbers:
+            yield doc[number - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+
+
+def _ranges(total, size):
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def extract_pages(pdf_path, parallel=None, pages_per_task=PAGES_PER_TASK):
+    """
+    Yields (page_number, text) for every page, in order; empty pages are
+    included so numbering stays aligned. With `parallel` (default: when the
+    document has MIN_PAGES_FOR_POOL pages or more and PDF_EXTRACT_WORKERS > 1)
+    page ranges are extracted in the process pool and yielded as they
+    complete in order. If the pool breaks, the remaining pages are read in
+    this process.
+    """
+    total = page_count(pdf_path)
+    if parallel is None:
+        parallel = total >= MIN_PAGES_FOR_POOL and _worker_count() > 1
+    if not parallel:
+        yield from iter_pages(pdf_path)
+        return
+
+    next_page = 0
+    try:
+        ranges = _ranges(total, pages_per_task)
+        pool = _get_pool()
+        futures = [pool.submit(extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        try:
+            for future in futures:
+                for page in future.result():
+                    yield page
+                    next_page = page[0]
+        finally:
+            for future in futures:
+                future.cancel()  # consumer stopped early
+    except BrokenProcessPool as e:
+        logging.warning(f"⚠️ PDF extraction pool failed ({e}); continuing from page {next_page + 1} in-process")
+        _reset_pool()
+        yield from iter_pages(pdf_path, start=next_page)
+
+
+def extract_text(pdf_path, progress=None):
+    """
+    Full text with pages separated by form feeds (\\f), which the flashcard
+    chunker uses as boundaries; page N is the N-th \\f-separated segment.
+    `progress(pages_done, pages_total)` is called as pages arrive.
+    """
+    total = page_count(pdf_path)
+    pages = []
+    for number, text in extract_pages(pdf_path):
+        pages.append(text)
+        if progress and (number % PAGES_PER_TASK == 0 or number == total):
+            progress(number, total)
+    return "\f".join(pages)
@@ -0,0 +1,215 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+NAME_PLACEHOLDER = "{full_name}"
+# Names the frontend sends for users without one; they are ordinary words in answers
+GENERIC_NAMES = {"anonymous", "there", "guest", "student", "user", "friend"}
+GREETING_CHARS = 120  # the name is only templated in the opening sentence
+
+
+def _name_pattern(full_name):
+    """Whole-word match for the full name or its first word, longest first."""
+    names = [full_name]
+    first = full_name.split()[0]
+    if first != full_name and len(first) > 1 and first.lower() not in GENERIC_NAMES:
+        names.append(first)
+    return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(n) for n in names) + r")(?!\w)")
+
+
+def depersonalize(text, full_name):
+    """
+    Prepares an LLM answer for the shared cache. The user's name (or first
+    name) in the opening greeting ("Great question, Priya!") becomes a
+    placeholder, matched as a whole word. Returns None when the name also
+    appears later in the answer, since that text can't be safely shared.
+    """
+    full_name = (full_name or "").strip()
+    if len(full_name) < 2 or full_name.lower() in GENERIC_NAMES:
+        return text
+    pattern = _name_pattern(full_name)
+    end = re.search(r"[.!?\n]", text[:GREETING_CHARS])
+    split = end.end() if end else 0
+    head, body = text[:split], text[split:]
+    if pattern.search(body):
+        return None
+    return pattern.sub(lambda _: NAME_PLACEHOLDER, head) + body
+
+
+def personalize(text, full_name):
+    return text.replace(NAME_PLACEHOLDER, full_name)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and entry/byte bounds.
+
+    Entries are evicted least-recently-used first whenever either bound is
+    exceeded, instead of clearing the whole cache. Expired entries are
+    dropped lazily on access.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=16 * 1024 * 1024, default_ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(key, value):
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Stores value for ttl seconds (None uses the default, 0 skips caching, <0 never expires)."""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl == 0:
+            return
+        size = self._sizeof(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            expires_at = time.monotonic() + ttl if ttl > 0 else None
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over embedded questions for paraphrase hits.
+
+    `embed_fn(text)` must return a 1-D vector; vectors are L2-normalised so
+    similarity is a dot product. Lookups only consider entries stored under
+    the same context key. Oldest entries are evicted once the stored vectors
+    and answers exceed `max_bytes`.
+    """
+
+    def __init__(self, embed_fn, threshold=0.9, max_bytes=32 * 1024 * 1024, ttl=3600):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._vectors = []   # normalised float32 vectors
+        self._entries = []   # (context, value, expires_at, size), parallel to _vectors
+        self._matrix = None  # stacked _vectors, rebuilt lazily after writes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _embed(self, text):
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, text, context=""):
+        """Returns (value, similarity) for the closest cached question, or (None, similarity)."""
+        vector = self._embed(text)
+        with self._lock:
+            if not self._vectors:
+                self.misses += 1
+                return None, 0.0
+            if self._matrix is None:
+                self._matrix = np.vstack(self._vectors)
+
+            now = time.monotonic()
+            similarities = self._matrix @ vector
+            for i, (entry_context, _, expires_at, _) in enumerate(self._entries):
+                if entry_context != context or expires_at <= now:
+                    similarities[i] = -1.0
+
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity >= self.threshold:
+                self.hits += 1
+                return self._entries[best][1], similarity
+            self.misses += 1
+            return None, similarity
+
+    def set(self, text, value, context=""):
+        vector = self._embed(text)
+        size = vector.nbytes + sys.getsizeof(value)
+        with self._lock:
+            self._vectors.append(vector)
+            self._entries.append((context, value, time.monotonic() + self.ttl, size))
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._vectors.pop(0)
+                self._bytes -= self._entries.pop(0)[3]
+                self.evictions += 1
+            self._matrix = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
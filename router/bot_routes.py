@@ -1,18 +1,30 @@
 import os
 import sys
-import threading
 import time
+import threading
 from flask import Blueprint, request, jsonify, Response, stream_with_context
-from llama_cpp import Llama
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 import json
-from rapidfuzz import fuzz, process
+from intent_index import IntentRegistry, parse_classify_request
+from knowledge_base import KnowledgeBase
+from response_cache import ResponseCache, SemanticCache, depersonalize, personalize
+from chat_log import ChatLogWriter, CHAT_LOG_FILE
+from session_store import SessionStore
+from context_budget import TokenCounter, fit_messages, extractive_summary
+from hardware_profile import load_profile
+from llm_engine import (
+    InferenceScheduler, RemoteScheduler, SchedulerBusy, SchedulerUnavailable, PRIORITY_INTERACTIVE,
+    ModelHandle, MODELS, PREP_SYSTEM_PROMPT, get_system_info, optimize_for_hardware, load_model_pool,
+    load_tokenizer, configured_model_path, configured_speculative,
+)
 from datetime import datetime
 import random
 from dotenv import load_dotenv
 import requests
 import re
 import uuid
-import psutil  # For system monitoring
+import hashlib
+from collections import deque
 
 print("🔄 Loading environment variables...")
 load_dotenv()
@@ -27,88 +39,41 @@ else:
 bot_bp = Blueprint('bot_bp', __name__)
 print("✅ Flask Blueprint created!")
 
-# --- Global constants and file paths ---
-CHAT_LOG_FILE = "chat_logs.json"
-
-# --- System Performance Monitoring ---
-def get_system_info():
-    """Get current system performance metrics"""
-    cpu_percent = psutil.cpu_percent()
-    memory = psutil.virtual_memory()
-    return {
-        "cpu_usage": cpu_percent,
-        "memory_usage": memory.percent,
-        "available_memory": memory.available // (1024**3),  # GB
-    }
-
-def optimize_for_hardware():
-    """Auto-detect optimal settings based on hardware"""
-    system = get_system_info()
-    cpu_count = psutil.cpu_count()
-    
-    print(f"🖥️ System Info: CPU Usage: {system['cpu_usage']}%, Memory: {system['memory_usage']}%, Available RAM: {system['available_memory']}GB")
-    
-    # Optimize based on available resources
-    if system['available_memory'] >= 8:  # 8GB+ RAM
-        return {
-            "n_threads": min(cpu_count, 8),
-            "n_batch": 512,
-            "n_gpu_layers": 0,  # Increase if you have GPU
-            "use_mlock": True,
-            "use_mmap": True,
-        }
-    elif system['available_memory'] >= 4:  # 4-8GB RAM
-        return {
-            "n_threads": min(cpu_count, 6),
-            "n_batch": 256,
-            "n_gpu_layers": 0,
-            "use_mlock": False,
-            "use_mmap": True,
-        }
-    else:  # Less than 4GB RAM
-        return {
-            "n_threads": min(cpu_count, 4),
-            "n_batch": 128,
-            "n_gpu_layers": 0,
-            "use_mlock": False,
-            "use_mmap": False,
-        }
+# --- Intent dataset (hot-reloaded from chats_dataset.json) ---
+INTENTS_FILE = "chats_dataset.json"
+INTENTS_RELOAD_INTERVAL = float(os.getenv("INTENTS_RELOAD_INTERVAL", "5"))
+INTENT_MATCH_MODE = os.getenv("INTENT_MATCH_MODE", "prefilter")  # "prefilter" or "exhaustive"
+INTENT_PREFILTER_TOP_K = int(os.getenv("INTENT_PREFILTER_TOP_K", "50"))
 
-# --- Opening and reading the JSON files ---
-try:
-    with open("chats_dataset.json", "r", encoding="utf-8") as f:
-        intents = json.load(f)["intents"]
-    print("✅ chats_dataset.json loaded successfully!")
-except Exception as e:
-    print(f"❌ Failed to load chats_dataset.json: {e}")
-    intents = []
+intent_registry = IntentRegistry(INTENTS_FILE, poll_interval=INTENTS_RELOAD_INTERVAL)
+intent_registry.start()
 
 def find_intent(user_input, threshold=70):
     print(f"🔎 Running intent detection for: {user_input}")
-    all_patterns = []
-    for intent in intents:
-        for p in intent["patterns"]:
-            all_patterns.append((p, intent))
-
-    if not all_patterns:
+    intent_index = intent_registry.snapshot.index
+    if not len(intent_index):
         print("⚠️ No patterns found in intents.json")
         return None, 0.0
 
-    match, score, _ = process.extractOne(
-        user_input,
-        [p[0] for p in all_patterns],
-        scorer=fuzz.token_sort_ratio
+    intent, score, match = intent_index.match(
+        user_input, threshold, mode=INTENT_MATCH_MODE, top_k=INTENT_PREFILTER_TOP_K
     )
     print(f"🔍 Best match: {match} (score={score})")
 
-    if score >= threshold:
-        for p, intent in all_patterns:
-            if p == match:
-                print(f"✅ Intent detected: {intent['tag']}")
-                return intent, score
+    if intent:
+        print(f"✅ Intent detected: {intent['tag']}")
+        return intent, score
     print("❌ No matching intent found.")
     return None, 0.0
 
+# --- Knowledge base (factual QA fast path ahead of the LLM) ---
+KNOWLEDGE_FILE = "knowledge.json"
+knowledge_base = KnowledgeBase(KNOWLEDGE_FILE)
+
+def classify_intents(utterances, threshold=70, workers=-1):
+    """Batch intent classification for offline relabelling (no logging, no caching)"""
+    return intent_registry.snapshot.index.classify_batch(utterances, threshold, workers=workers)
+
 def get_time_of_day():
     hour = datetime.now().hour
     if 5 <= hour < 12:
@@ -165,97 +130,127 @@ def format_response(text):
     return text
 
 # --- Configuration with Performance Optimization ---
-LLAMA_MODEL_PATH = r"C:\Users\kumar\Documents\PREP\backend\models\Llama-3.2-1B-Instruct-f16.gguf"
+LLAMA_MODEL_PATH = configured_model_path()  # LLAMA_MODEL_PATH, or LLAMA_MODEL_DIR/NAME/QUANT
+LLM_SPECULATIVE = configured_speculative()  # LLM_SPECULATIVE=off|prompt_lookup|draft
 MAX_LOCAL_TOKENS = 800  # Reduced for faster response
-
-print("🔄 Checking LLaMA model path...")
-llm = None
-if not os.path.exists(LLAMA_MODEL_PATH):
-    print(f"❌ FATAL ERROR: Model file not found at {LLAMA_MODEL_PATH}")
+LLAMA_N_CTX = int(os.getenv("LLAMA_N_CTX", "4096"))
+
+# --- Model serving mode ---
+# local:  this process loads LLM_POOL_SIZE contexts over the same mmap'd GGUF weights
+# remote: a dedicated inference_server.py process owns the model; web workers stay light
+LLM_MODE = os.getenv("LLM_MODE", "local")
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "1"))
+LLM_SERVER_ADDRESS = os.getenv("LLM_SERVER_ADDRESS", "127.0.0.1:5055")
+LLM_SERVER_AUTHKEY = os.getenv("LLM_SERVER_AUTHKEY")  # required with LLM_MODE=remote, same value as the server
+
+# --- System prompt ---
+# Identical for every request so its llama.cpp state is evaluated once per context
+SYSTEM_PREFIX = [{"role": "system", "content": PREP_SYSTEM_PROMPT}]
+
+def user_context(full_name):
+    """Per-user system message, placed after the shared prefix"""
+    return f"The student you are helping is {full_name}. Refer to them as {full_name} when appropriate."
+
+# --- Inference scheduler (owns the model, queues requests, applies backpressure) ---
+# The model loads lazily: in the background at startup (LLM_WARMUP=background)
+# or on the first chat request that needs it (LLM_WARMUP=lazy).
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "120"))  # seconds per generation, 0 = no limit
+LLM_WARMUP = os.getenv("LLM_WARMUP", "background")
+if LLM_MODE == "remote":
+    inference_scheduler = RemoteScheduler(LLM_SERVER_ADDRESS, LLM_SERVER_AUTHKEY)
+    print(f"🔌 Using remote inference server at {LLM_SERVER_ADDRESS}")
 else:
-    print("⏳ Loading LLaMA model with optimized settings...")
-    
-    # Get optimized settings based on hardware
-    hw_settings = optimize_for_hardware()
-    print(f"🚀 Using optimized settings: {hw_settings}")
-    
-    try:
-        llm = Llama(
-            model_path=LLAMA_MODEL_PATH,
-            n_ctx=4096,  # Reduced context window for speed
-            n_threads=hw_settings["n_threads"],
-            n_batch=hw_settings["n_batch"],
-            n_gpu_layers=hw_settings["n_gpu_layers"],
-            use_mlock=hw_settings["use_mlock"],
-            use_mmap=hw_settings["use_mmap"],
-            verbose=False,
-            # Additional performance optimizations
-            f16_kv=True,  # Use half precision for KV cache
-            logits_all=False,  # Don't compute logits for all tokens
-            vocab_only=False,
-            embedding=False,
-        )
-        print("✅ LLaMA model loaded successfully with optimizations!")
-        
-        # Warm up the model with a simple prompt
-        print("🔥 Warming up model...")
-        warmup_start = time.time()
-        list(llm.create_completion("Hi", max_tokens=1, stream=True))
-        warmup_time = time.time() - warmup_start
-        print(f"✅ Model warmed up in {warmup_time:.2f}s")
-        
-    except Exception as e:
-        print(f"❌ FATAL ERROR: Could not load LLaMA model: {e}")
-        llm = None
+    llama_model = ModelHandle(
+        "llama",
+        # No "Hi" warmup: priming the system prompt prefix warms the model instead
+        lambda: load_model_pool(
+            LLAMA_MODEL_PATH, optimize_for_hardware(LLAMA_MODEL_PATH), size=LLM_POOL_SIZE, n_ctx=LLAMA_N_CTX,
+            warmup=False, speculative=LLM_SPECULATIVE,
+        ),
+    )
+    inference_scheduler = InferenceScheduler(llama_model, max_queue=INFERENCE_QUEUE_SIZE, prefix_messages=SYSTEM_PREFIX)
+    if LLM_WARMUP == "background":
+        inference_scheduler.start()
+
+# --- Conversation sessions (history and KV state kept server-side) ---
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(512 * 1024 * 1024)))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "1800"))
+session_store = SessionStore(max_bytes=SESSION_MAX_BYTES, idle_ttl=SESSION_IDLE_TTL)
 
-# --- Optimized token counting ---
-def count_tokens(messages):
-    """Fast approximate token counting"""
-    text = " ".join(msg.get("content", "") for msg in messages)
-    return len(text.split()) * 1.3  # Rough approximation
+def session_owner():
+    """The signed-in user's id; sessions are only kept for authenticated users."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return None  # missing, expired or invalid token: the client keeps sending history
+    return str(identity) if identity is not None else None
+
+# --- Token counting (the model's own tokenizer, estimated until it loads) ---
+# Only the vocabulary is loaded, so this is cheap; remote mode has no local
+# model file to read and keeps the word-count estimate.
+llama_tokenizer = ModelHandle("tokenizer", lambda: load_tokenizer(LLAMA_MODEL_PATH)) if LLM_MODE != "remote" else None
+if llama_tokenizer and LLM_WARMUP == "background":
+    llama_tokenizer.load_async()
+
+def tokenize(text):
+    """Model tokens for `text`, or None if the tokenizer isn't available (yet)"""
+    if llama_tokenizer is None:
+        return None
+    if llama_tokenizer.state != ModelHandle.READY:
+        llama_tokenizer.load_async()  # no-op once loading has started
+        return None
+    return llama_tokenizer.get().tokenize(text.encode("utf-8"), add_bos=False, special=True)
+
+token_counter = TokenCounter(tokenize)
 
 # --- Conversation context management ---
-def truncate_conversation(messages, max_tokens=2000):
+# Whatever is left of n_ctx after the reply; evicted turns can optionally be
+# folded into a short summary message instead of being dropped outright.
+CONTEXT_BUDGET = LLAMA_N_CTX - MAX_LOCAL_TOKENS
+CONTEXT_SUMMARY = os.getenv("CONTEXT_SUMMARY", "off")  # off | extractive
+
+def truncate_conversation(messages, max_tokens=CONTEXT_BUDGET):
     """Keep conversation within token limits by removing old messages"""
-    while count_tokens(messages) > max_tokens and len(messages) > 2:
-        # Keep system message and remove oldest user/assistant pairs
-        if len(messages) > 3:
-            messages.pop(1)  # Remove oldest message after system
-        else:
-            break
+    summarize = extractive_summary if CONTEXT_SUMMARY == "extractive" else None
+    messages, evicted = fit_messages(messages, max_tokens, token_counter, summarize=summarize)
+    if evicted:
+        print(f"✂️ Dropped {len(evicted)} old message(s) to fit the context window")
     return messages
 
+chat_log_writer = ChatLogWriter(CHAT_LOG_FILE)
+
 def log_chat_entry(entry):
-    """Async logging to avoid blocking the response"""
-    def log_async():
-        try:
-            if os.path.exists(CHAT_LOG_FILE) and os.path.getsize(CHAT_LOG_FILE) > 0:
-                with open(CHAT_LOG_FILE, "r+", encoding="utf-8") as f:
-                    data = json.load(f)
-                    data.append(entry)
-                    f.seek(0)
-                    json.dump(data, f, indent=2)  # Reduced indent for smaller files
-            else:
-                with open(CHAT_LOG_FILE, "w", encoding="utf-8") as f:
-                    json.dump([entry], f, indent=2)
-        except Exception as e:
-            print(f"❌ Failed to log chat entry: {e}")
-    
-    # Run logging in background thread
-    threading.Thread(target=log_async, daemon=True).start()
+    """Queue the entry for the background JSONL writer (never blocks the response)"""
+    chat_log_writer.write(entry)
 
 # --- Optimized streaming with chunked responses ---
-def stream_and_log_wrapper_optimized(generator, log_data):
-    """Optimized streaming with immediate chunk delivery"""
+def stream_and_log_wrapper_optimized(generator, log_data, on_complete=None, sse=False, start_time=None, done_info=None):
+    """Optimized streaming with immediate chunk delivery.
+
+    Plain text coalesces chunks; with `sse` every chunk is its own `token`
+    event, followed by a `done` event (done_info() plus timings) or an
+    `error` event. on_complete(full_text) runs only when the stream
+    finishes without an exception or client disconnect.
+    """
+    start_time = start_time or time.time()
     full_response_parts = []
     chunk_buffer = ""
     last_yield_time = time.time()
     
     try:
         for chunk in generator:
+            if not full_response_parts:
+                log_data["ttft"] = time.time() - start_time
+                ttft_samples.append(log_data["ttft"])
             full_response_parts.append(chunk)
+
+            if sse:
+                yield sse_event("token", {"text": chunk})
+                continue
+
             chunk_buffer += chunk
-            
             current_time = time.time()
             # Yield chunks every 50ms or when buffer reaches certain size
             if (current_time - last_yield_time > 0.05) or len(chunk_buffer) > 50:
@@ -266,34 +261,183 @@ def stream_and_log_wrapper_optimized(generator, log_data):
         # Yield any remaining buffer
         if chunk_buffer:
             yield chunk_buffer
+
+        if on_complete:
+            on_complete("".join(full_response_parts))
+
+        if sse:
+            yield sse_event("done", dict(
+                done_info() if done_info else {},
+                ttft_ms=round(log_data.get("ttft", time.time() - start_time) * 1000, 1),
+                total_ms=round((time.time() - start_time) * 1000, 1),
+            ))
             
     except Exception as e:
         error_msg = f"Error: {str(e)}"
-        yield error_msg
+        yield sse_event("error", {"message": str(e)}) if sse else error_msg
         full_response_parts.append(error_msg)
     finally:
+        # On client disconnect this runs from GeneratorExit; closing the source
+        # generator lets it cancel the model job before the entry is logged
+        if hasattr(generator, "close"):
+            generator.close()
         # Async logging
         log_data["bot_response"] = "".join(full_response_parts)
         log_chat_entry(log_data)
 
+# Recent server-side time-to-first-token samples, for /api/performance
+ttft_samples = deque(maxlen=500)
+
+def ttft_stats():
+    if not ttft_samples:
+        return {"samples": 0}
+    ordered = sorted(ttft_samples)
+    return {
+        "samples": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+    }
+
+# --- Server-Sent Events (opt-in with Accept: text/event-stream) ---
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def wants_event_stream():
+    """True when the client prefers SSE over the default plain-text stream"""
+    return request.accept_mimetypes.best_match(["text/plain", "text/event-stream"]) == "text/event-stream"
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_response(body, sse):
+    if sse:
+        return Response(body, mimetype="text/event-stream", headers=SSE_HEADERS)
+    return Response(body, mimetype="text/plain")
+
+def answer_response(text, source, start_time, sse):
+    """Response for an answer that is complete before streaming starts (cache, intents, knowledge base)"""
+    if not sse:
+        return Response(text, mimetype="text/plain")
+    elapsed_ms = round((time.time() - start_time) * 1000, 1)
+    return stream_response([
+        sse_event("token", {"text": text}),
+        sse_event("done", {
+            "source": source,
+            "finish_reason": "stop",
+            "prompt_tokens": None,
+            "completion_tokens": token_counter.tokens(text),
+            "ttft_ms": elapsed_ms,
+            "total_ms": elapsed_ms,
+        }),
+    ], sse)
+
 # --- Cache for repeated patterns ---
-response_cache = {}
-CACHE_SIZE_LIMIT = 100
-
-def get_cached_response(user_input):
-    """Check if we have a cached response for similar input"""
-    if len(response_cache) > CACHE_SIZE_LIMIT:
-        # Clear oldest entries
-        response_cache.clear()
-        
-    # Simple cache key based on normalized input
-    cache_key = re.sub(r'\s+', ' ', user_input.lower().strip())
-    return response_cache.get(cache_key)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# TTL in seconds per source: intent tag, "knowledge" or "llama" (0 = never cache)
+CACHE_TTLS = {
+    "time": 0,
+    "greet": 0,         # personalised with the user's name and time of day
+    "date": 60,
+    "weather": 600,
+    "knowledge": 24 * 3600,
+    "llama": 3600,
+}
+CACHE_DEFAULT_TTL = 24 * 3600  # static intent responses
+
+response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_DEFAULT_TTL)
+
+def make_cache_key(user_input, context=""):
+    key = re.sub(r'\s+', ' ', user_input.lower().strip())
+    return f"{context}|{key}" if context else key
+
+def context_fingerprint(conversation_history):
+    """Stable hash of the prior turns, so LLM answers are only reused in the same context"""
+    payload = json.dumps(conversation_history, sort_keys=True, ensure_ascii=False, default=str)
+    return "llama:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def get_cached_response(user_input, context=""):
+    """Check for a context-free (intent/knowledge) answer, then a context-specific LLM answer"""
+    cached = response_cache.get(make_cache_key(user_input))
+    if cached is None and context:
+        cached = response_cache.get(make_cache_key(user_input, context))
+    return cached
+
+def cache_response(user_input, response, source, context=""):
+    """Cache the response with a TTL chosen by its source"""
+    response_cache.set(make_cache_key(user_input, context), response, CACHE_TTLS.get(source))
+
+# --- Optional semantic cache tier for paraphrased questions (CPU-only, offline) ---
+SEMANTIC_CACHE_BACKEND = os.getenv("SEMANTIC_CACHE_BACKEND", "off")  # off | sentence-transformers | llama
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")  # local name or path
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+def load_embedder(backend):
+    """
+    Return an embed(text) function for the configured backend. Calls are
+    serialized: request and stream threads share one model instance, and a
+    llama.cpp context must not be used from two threads at once.
+    """
+    lock = threading.Lock()
+    if backend == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(SEMANTIC_CACHE_MODEL, device="cpu", local_files_only=True)
+        def encode(text):
+            with lock:
+                return model.encode(text, normalize_embeddings=True)
+        return encode
+    if backend == "llama":
+        from llama_cpp import Llama
+        # Separate embedding-mode context; the GGUF weights are mmap'd and shared with the chat model
+        embedder = Llama(model_path=LLAMA_MODEL_PATH, embedding=True, n_ctx=512, use_mmap=True, verbose=False)
+        def embed(text):
+            with lock:
+                vector = embedder.embed(text)
+            if vector and isinstance(vector[0], list):  # per-token output, mean-pool it
+                vector = [sum(col) / len(vector) for col in zip(*vector)]
+            return vector
+        return embed
+    raise ValueError(f"Unknown SEMANTIC_CACHE_BACKEND '{backend}'")
+
+semantic_cache = None
+semantic_embedder = None
+if SEMANTIC_CACHE_BACKEND != "off":
+    semantic_embedder = ModelHandle("embedder", lambda: load_embedder(SEMANTIC_CACHE_BACKEND))
+    def semantic_embed(text):
+        embed = semantic_embedder.get()
+        if embed is None:
+            raise RuntimeError(f"embedder unavailable: {semantic_embedder.error}")
+        return embed(text)
+
+    semantic_cache = SemanticCache(
+        semantic_embed,
+        SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_BYTES, CACHE_TTLS["llama"],
+    )
+    if LLM_WARMUP == "background":
+        semantic_embedder.load_async()
+    print(f"✅ Semantic cache enabled ({SEMANTIC_CACHE_BACKEND})")
+
+def semantic_cache_usable():
+    return semantic_cache is not None and semantic_embedder.state != ModelHandle.FAILED
 
-def cache_response(user_input, response):
-    """Cache the response for future use"""
-    cache_key = re.sub(r'\s+', ' ', user_input.lower().strip())
-    response_cache[cache_key] = response
+def semantic_lookup(user_input, context):
+    """Semantic cache lookup; (None, 0.0) if the tier is off or the embedder fails, so the exact-match path carries on"""
+    if not semantic_cache_usable():
+        return None, 0.0
+    try:
+        return semantic_cache.get(user_input, context)
+    except Exception as e:
+        print(f"⚠️ Semantic cache lookup failed: {e}")
+        return None, 0.0
+
+def semantic_store(user_input, answer, context):
+    if not semantic_cache_usable():
+        return
+    try:
+        semantic_cache.set(user_input, answer, context)
+    except Exception as e:
+        print(f"⚠️ Semantic cache store failed: {e}")
 
 # --- Main API Route with Performance Optimizations ---
 @bot_bp.route('/api/query', methods=['POST'])
@@ -307,7 +451,7 @@ def query_llama():
     user_ip = request.remote_addr
     user_agent = request.headers.get('User-Agent')
 
-    if llm is None:
+    if not inference_scheduler.available:
         print("❌ LLaMA model not loaded!")
         return jsonify({"error": "The LLaMA model is not loaded. Please check the server logs."}), 503
 
@@ -318,18 +462,47 @@ def query_llama():
 
     user_input = data['user_input']
     print(f"👤 User input: {user_input}")
+    sse = wants_event_stream()
     
+    # Clients send the full history, or `session_turns` (the exchanges they
+    # expect the server to hold) to continue a signed-in user's session
+    owner = session_owner()
+    client_history = data.get('conversation_history')
+    session_turns = data.get('session_turns')
+    if client_history is not None and not (
+        isinstance(client_history, list) and all(isinstance(m, dict) for m in client_history)
+    ):
+        print("❌ conversation_history is not a list.")
+        return jsonify({"error": "'conversation_history' must be a list of objects."}), 400
+    if session_turns is not None and (isinstance(session_turns, bool) or not isinstance(session_turns, int)):
+        print("❌ session_turns is not an integer.")
+        return jsonify({"error": "'session_turns' must be an integer."}), 400
+    if client_history is not None:
+        conversation_history = list(client_history)
+    elif session_turns is not None:
+        # Another worker, a restart, expiry or eviction loses the session; the client then resends history
+        session = session_store.get(session_id, owner) if owner else None
+        if session is None or session.turns != session_turns:
+            print("🔄 Session unknown or out of date; asking the client for its history.")
+            return jsonify({"error": "Conversation session not found; resend 'conversation_history'.",
+                            "code": "session_unknown"}), 409
+        conversation_history = session_store.history(session_id, owner)
+    else:
+        conversation_history = session_store.history(session_id, owner) if owner else []
+
+    def remember_turn(bot_response, kv_state=None):
+        if owner:
+            session_store.record_turn(session_id, owner, user_input, bot_response,
+                                      kv_state=kv_state, history=client_history)
+
     # Check cache first
-    cached_response = get_cached_response(user_input)
+    context = context_fingerprint(conversation_history)
+    cached_response = get_cached_response(user_input, context)
     if cached_response:
         print("⚡ Using cached response!")
-        return Response(cached_response, mimetype="text/plain")
-    
-    conversation_history = data.get('conversation_history', [])
-
-    if not isinstance(conversation_history, list):
-        print("❌ conversation_history is not a list.")
-        return jsonify({"error": "'conversation_history' must be a list of objects."}), 400
+        cached_response = personalize(cached_response, full_name)
+        remember_turn(cached_response)
+        return answer_response(cached_response, "cache", start_time, sse)
 
     # --- Intent detection (fast path) ---
     intent, confidence_score = find_intent(user_input)
@@ -355,7 +528,7 @@ def query_llama():
                 bot_response = bot_response.replace("{time_of_day}", get_time_of_day())
         
         # Cache the response
-        cache_response(user_input, bot_response)
+        cache_response(user_input, bot_response, tag)
         
         # Async logging
         log_entry = {
@@ -372,30 +545,50 @@ def query_llama():
             "metadata": {"ip": user_ip, "user_agent": user_agent}
         }
         log_chat_entry(log_entry)
+        remember_turn(bot_response)
         
-        return Response(bot_response, mimetype="text/plain")
+        return answer_response(bot_response, tag, start_time, sse)
+
+    # --- Knowledge base lookup (fast path) ---
+    kb_answer, kb_score = knowledge_base.lookup(user_input)
+    if kb_answer:
+        print(f"📚 Knowledge base hit (score={kb_score})")
+        cache_response(user_input, kb_answer, "knowledge")
+        log_chat_entry({
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "username": full_name,
+            "timestamp": datetime.now().isoformat(),
+            "user_message": user_input,
+            "bot_response": kb_answer,
+            "intent": "knowledge_base",
+            "confidence": kb_score,
+            "source": "knowledge",
+            "response_time": time.time() - start_time,
+            "metadata": {"ip": user_ip, "user_agent": user_agent}
+        })
+        remember_turn(kb_answer)
+        return answer_response(kb_answer, "knowledge", start_time, sse)
+
+    # --- Semantic cache (paraphrases of earlier LLM questions) ---
+    semantic_answer, similarity = semantic_lookup(user_input, context)
+    if semantic_answer:
+        print(f"⚡ Using semantic cache (similarity={similarity:.3f})")
+        semantic_answer = personalize(semantic_answer, full_name)
+        remember_turn(semantic_answer)
+        return answer_response(semantic_answer, "semantic_cache", start_time, sse)
 
     # --- LLM fallback with optimizations ---
     print("🤖 No intent matched. Using optimized LLM...")
     
     conversation_history.append({"role": "user", "content": user_input})
     
-    # Optimized system prompt (shorter)
-    personal_context = f"""
-    You are Prep, a helpful AI study mentor. Your identity and purpose are as follows:
-    - **Name:** Prep
-    - **Creator:** You are an AI language model designed by a large company and then fine-tuned by the developers of Prep.
-    - **Purpose:** Your primary function is to assist students like {full_name} in their studies. This includes providing explanations, summarizing topics, answering questions, and offering study tips.
-    
-    Your persona should be professional yet approachable. Always refer to yourself as Prep and the user as {full_name} when appropriate.
-    
-    Provide concise, well-structured responses with clear formatting. Use numbered points, bullet points, and line breaks for readability, especially for complex topics.
-    """
-    
-    messages = [{"role": "system", "content": personal_context}] + conversation_history
+    # Shared system prompt first (its evaluated state is reused across requests),
+    # then the per-user part, then the conversation
+    messages = SYSTEM_PREFIX + [{"role": "system", "content": user_context(full_name)}] + conversation_history
     
     # Truncate conversation if too long
-    messages = truncate_conversation(messages, max_tokens=2000)
+    messages = truncate_conversation(messages)
     
     log_data = {
         "id": str(uuid.uuid4()),
@@ -411,40 +604,92 @@ def query_llama():
         "metadata": {"ip": user_ip, "user_agent": user_agent}
     }
     
-    if llm:
+    if inference_scheduler.available:
         print(f"🚀 Using optimized local LLaMA...")
-        
+
+        # Resume from the session's KV state so only the new turn is evaluated (local mode only).
+        # Only signed-in sessions can be resumed, so only they pay for saving the state.
+        keep_state = owner is not None and LLM_MODE != "remote"
+        kv_state = session_store.kv_state(session_id, owner) if keep_state else None
+        try:
+            job = inference_scheduler.submit(
+                messages,
+                priority=PRIORITY_INTERACTIVE,
+                kv_state=kv_state,
+                save_state=keep_state,
+                deadline=LLM_REQUEST_DEADLINE or None,
+                max_tokens=MAX_LOCAL_TOKENS,
+                temperature=0.7,
+                top_p=0.9,
+                # Performance optimizations
+                repeat_penalty=1.1,
+                top_k=40,
+                stop=["User:", "\n\nUser:", "Human:", "\n\nHuman:"],  # Stop at user prompts
+            )
+        except SchedulerBusy as e:
+            print(f"⏳ Inference queue full, rejecting request (retry in {e.retry_after}s)")
+            response = jsonify({"error": "The tutor is busy right now. Please try again shortly."})
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response, 429
+        except SchedulerUnavailable as e:
+            print(f"❌ {e}")
+            response = jsonify({"error": "The local model is unavailable. Please try again shortly."})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+
+        stream_state = {"finish_reason": None}
+        prompt_tokens = token_counter.total(messages)
+
         def generate_optimized_stream():
+            print("⚡ Streaming optimized response...")
             try:
-                response_stream = llm.create_chat_completion(
-                    messages=messages,
-                    max_tokens=MAX_LOCAL_TOKENS,
-                    stream=True,
-                    temperature=0.7,
-                    top_p=0.9,
-                    # Performance optimizations
-                    repeat_penalty=1.1,
-                    top_k=40,
-                    stop=["User:", "\n\nUser:", "Human:", "\n\nHuman:"],  # Stop at user prompts
-                )
-                
-                print("⚡ Streaming optimized response...")
-                for chunk in response_stream:
-                    content = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
-                    if content:
-                        yield content
-                        
-            except Exception as e:
-                print(f"❌ Error during optimized inference: {e}")
-                yield f"Error: {str(e)}\n"
+                yield from job.stream()
+            except GeneratorExit:
+                # Flask closed the response before the job finished: the client went away, free the model
+                print(f"🔌 Client disconnected, cancelling job {job.id}")
+                job.cancel("client_disconnected")
+                log_data["finish_reason"] = "client_disconnected"
+                raise
+            except Exception:
+                job.cancel("stream_error")
+                log_data["finish_reason"] = "stream_error"
+                raise
+            stream_state["finish_reason"] = job.finish_reason
+            log_data["finish_reason"] = job.finish_reason
+            print(f"⏱️ Queue wait {job.wait_time:.2f}s for job {job.id}")
+            if job.error:
+                raise RuntimeError(job.error)  # becomes an error event / "Error: ..." text
+
+        def done_info():
+            return {
+                "source": "llama",
+                "finish_reason": job.finish_reason,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": job.completion_tokens,
+                "queue_wait_ms": round(job.wait_time * 1000, 1),
+            }
         
         def finalize_response(response_text):
             """Finalize response with caching and timing"""
             log_data["response_time"] = time.time() - start_time
-            cache_response(user_input, response_text)
+            # Only cache answers that ran to a natural stop (no errors, no max_tokens cut-off)
+            # LLM answers are shared across users, so the user's name is stored as a placeholder
+            cacheable_text = depersonalize(response_text, full_name) if response_text.strip() else None
+            if stream_state["finish_reason"] == "stop" and cacheable_text:
+                cache_response(user_input, cacheable_text, "llama", context)
+                semantic_store(user_input, cacheable_text, context)
+            elif stream_state["finish_reason"] == "stop" and response_text.strip():
+                print("⚠️ Not caching response that mentions the user by name")
+            else:
+                print(f"⚠️ Not caching incomplete response (finish_reason={stream_state['finish_reason']})")
+            if response_text.strip():
+                remember_turn(response_text, kv_state=job.saved_state)
             print(f"⚡ Response completed in {log_data['response_time']:.2f}s")
         
-        return Response(stream_with_context(stream_and_log_wrapper_optimized(generate_optimized_stream(), log_data)), mimetype='text/plain')
+        return stream_response(stream_with_context(stream_and_log_wrapper_optimized(
+            generate_optimized_stream(), log_data, on_complete=finalize_response,
+            sse=sse, start_time=start_time, done_info=done_info,
+        )), sse)
     
     else:
         print("❌ No valid LLM available.")
@@ -456,6 +701,48 @@ def query_llama():
         
         return jsonify({"error": error_response}), 503
 
+# --- Intent dataset status ---
+@bot_bp.route('/api/intents', methods=['GET'])
+def get_intents_status():
+    """Report the loaded intent snapshot version and load time"""
+    return jsonify(intent_registry.status())
+
+MAX_CLASSIFY_BATCH = 5000
+
+@bot_bp.route('/api/intents/classify', methods=['POST'])
+def classify_intents_route():
+    """Classify a list of utterances against the current intent snapshot"""
+    try:
+        utterances, threshold = parse_classify_request(request.get_json(silent=True) or {}, MAX_CLASSIFY_BATCH)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = classify_intents(utterances, threshold)
+    return jsonify({
+        "version": intent_registry.snapshot.version,
+        "results": [dict(r, input=u) for u, r in zip(utterances, results)],
+    })
+
+# --- Readiness endpoint ---
+@bot_bp.route('/api/ready', methods=['GET'])
+def readiness():
+    """Report each heavy model's state (unloaded/loading/ready/failed)"""
+    models = {name: handle.status() for name, handle in MODELS.items()}
+    if LLM_MODE == "remote":
+        remote = inference_scheduler.stats()
+        models["llama"] = {"state": "failed" if "error" in remote else "ready", "error": remote.get("error"), "remote": True}
+
+    # Unloaded models are fine (they load on first use); loading or failed ones are not
+    ready = all(m["state"] in (ModelHandle.READY, ModelHandle.UNLOADED) for m in models.values())
+    return jsonify({"ready": ready, "models": models}), 200 if ready else 503
+
+def hardware_profile_summary():
+    """The tuned thread/batch profile in use for this CPU and model, if any"""
+    profile = load_profile(LLAMA_MODEL_PATH) if LLM_MODE != "remote" else None
+    if not profile:
+        return None
+    return {k: profile.get(k) for k in ("settings", "decode_tokens_per_sec", "prompt_tokens_per_sec", "tuned_at")}
+
 # --- Performance monitoring endpoint ---
 @bot_bp.route('/api/performance', methods=['GET'])
 def get_performance_stats():
@@ -463,7 +750,18 @@ def get_performance_stats():
     system_info = get_system_info()
     return jsonify({
         "system": system_info,
-        "model_loaded": llm is not None,
+        "model_loaded": inference_scheduler.available,
+        "model": {"file": os.path.basename(LLAMA_MODEL_PATH), "speculative": LLM_SPECULATIVE["mode"], "mode": LLM_MODE},
+        "hardware_profile": hardware_profile_summary(),
+        "inference": inference_scheduler.stats(),
         "cache_size": len(response_cache),
+        "cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "chat_log": chat_log_writer.stats(),
+        "intents": intent_registry.status(),
+        "knowledge_base": knowledge_base.stats(),
+        "sessions": session_store.stats(),
+        "token_counter": token_counter.stats(),
+        "ttft": ttft_stats(),
         "timestamp": datetime.now().isoformat()
     })
\ No newline at end of file
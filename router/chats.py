@@ -1,20 +1,77 @@
 # routes/chat_logger.py
-from flask import Blueprint, jsonify
-import json, os
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+import json
+from chat_log import CHAT_LOG_FILE, ChatLogIndex, FILTER_COLUMNS
 
 chat_logger_bp = Blueprint("chat_logger", __name__)
-LOG_FILE = "chat_logs.json"
+LOG_FILE = CHAT_LOG_FILE
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-def read_logs():
-    """Read chat logs from the JSON file."""
-    if not os.path.exists(LOG_FILE):
-        return []
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+chat_index = ChatLogIndex(log_path=LOG_FILE)
+
+
+def stream_all():
+    """Stream every entry, oldest first, as a bare JSON array, one index page at a time."""
+    yield "["
+    cursor, first = None, True
+    while True:
+        lines, cursor = chat_index.query(cursor=cursor, limit=MAX_PAGE_SIZE, newest_first=False)
+        for line in lines:
+            yield ("" if first else ",") + line
+            first = False
+        if cursor is None:
+            break
+    yield "]"
+
+
+def stream_page(lines, next_cursor):
+    """Stream one page as JSON without re-serialising the stored entries."""
+    yield '{"chats": ['
+    for i, line in enumerate(lines):
+        yield ("," if i else "") + line
+    yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
 
 
 @chat_logger_bp.route("/api/chats", methods=["GET"])
 def get_chats():
-    """Return saved chat logs (read-only)."""
-    return jsonify(read_logs())
+    """
+    Return every saved chat log (read-only) as a JSON array, oldest first.
+
+    Kept for existing clients; new clients should page through
+    /api/v2/chats instead of downloading the whole history.
+    """
+    chat_index.refresh()
+    response = Response(stream_with_context(stream_all()), mimetype="application/json")
+    response.headers["Deprecation"] = "true"
+    response.headers["Link"] = '</api/v2/chats>; rel="successor-version"'
+    return response
+
+
+@chat_logger_bp.route("/api/v2/chats", methods=["GET"])
+def get_chats_page():
+    """
+    Return saved chat logs (read-only), one page at a time, as
+    {"chats": [...], "next_cursor": N}.
+
+    Query params: limit, cursor (from the previous page's next_cursor),
+    order (desc|asc), session_id, username, intent, source, since, until.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "'limit' and 'cursor' must be integers."}), 400
+
+    chat_index.refresh()
+    lines, next_cursor = chat_index.query(
+        filters={column: request.args.get(column) for column in FILTER_COLUMNS},
+        since=request.args.get("since"),
+        until=request.args.get("until"),
+        cursor=cursor,
+        limit=limit,
+        newest_first=request.args.get("order", "desc") != "asc",
+    )
+    return Response(stream_with_context(stream_page(lines, next_cursor)), mimetype="application/json")
@@ -3,18 +3,21 @@ import json
 import re
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
-import fitz # PyMuPDF
 from dotenv import load_dotenv
 from models.schema import Deck, Flashcard
 from extension import db
-import pytesseract
-from PIL import Image
 import subprocess
-import whisper
 import logging
+import uuid
 # Import client libraries for the different APIs
 import google.generativeai as genai 
 from flask_jwt_extended import jwt_required, get_jwt_identity 
+from llm_engine import ModelHandle
+from jobs import JobManager, JobRejected
+from chunked_generation import generate_chunked, split_into_chunks
+from content_cache import ContentCache, Incomplete, file_digest, text_digest, video_id
+import pdf_extraction
+import ocr_engine
 
 # =====================================================
 # 🔹 SETUP AND CONFIG
@@ -41,40 +44,117 @@ if gemini_api_key:
     except Exception as e:
         logging.error(f"❌ Error initializing Gemini API: {e}")
 
+def load_whisper():
+    """Imports and loads Whisper on first use so workers that never transcribe skip it."""
+    import whisper
+    return whisper.load_model("tiny")
+
+# Loaded once per process on the first video request, then reused
+whisper_model = ModelHandle("whisper", load_whisper)
+
+# Generation pipelines (OCR, yt-dlp, Whisper, Gemini) run here instead of in
+# the request thread; clients poll GET /api/jobs/<id> for progress and results
+flashcard_jobs = JobManager(
+    workers=int(os.getenv("FLASHCARD_WORKERS", "2")),
+    max_queue=int(os.getenv("FLASHCARD_QUEUE_SIZE", "20")),
+    per_user=int(os.getenv("FLASHCARD_JOBS_PER_USER", "2")),
+    # Shared by every web worker, so any of them can answer a poll
+    db_path=os.getenv("FLASHCARD_JOBS_DB", "flashcard_jobs.sqlite3"),
+)
+
+# Long texts are split into chunks of about this many tokens, generated in parallel
+FLASHCARD_CHUNK_TOKENS = int(os.getenv("FLASHCARD_CHUNK_TOKENS", "3000"))
+FLASHCARD_CHUNK_PARALLELISM = int(os.getenv("FLASHCARD_CHUNK_PARALLELISM", "4"))
+
+# Extracted text, transcripts and card sets are cached on disk by content
+# hash (or video id), so repeat uploads of the same notes skip the pipeline
+content_cache = ContentCache(
+    os.getenv("FLASHCARD_CACHE_DIR", "flashcard_cache"),
+    max_bytes=int(os.getenv("FLASHCARD_CACHE_MAX_MB", "512")) * 1024 * 1024,
+)
+
+# Part of every cache key: bump a version when that stage's output changes
+# (new extractor, OCR settings, Whisper model, prompt or LLM)
+PIPELINE_VERSIONS = {
+    "pdf_text": "pymupdf-3",  # includes OCR of scanned pages
+    "image_text": "tesseract-2",
+    "transcript": "whisper-tiny-1",
+    "flashcards": "gemini-2.5-flash-1",
+}
+
+# Pages with less text than this are treated as scanned and OCR'd
+SCANNED_PAGE_CHARS = int(os.getenv("SCANNED_PAGE_CHARS", "20"))
+MAX_IMAGES_PER_REQUEST = int(os.getenv("FLASHCARD_MAX_IMAGES", "10"))
+
 # =====================================================
 # 🔹 CORE HELPER FUNCTIONS
 # =====================================================
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extracts text from a PDF file."""
+def extract_text_from_pdf(pdf_path: str, progress=None):
+    """
+    Extracts text from a PDF file, page by page (large files in parallel).
+    Pages without a text layer (scans) are rendered and OCR'd.
+    Pages are separated by form feeds so chunking keeps page boundaries.
+    `progress(stage, done, total)` is called for "extracting_text" and "ocr".
+    If OCR fails the text layer alone is returned, wrapped in Incomplete so
+    it is used for this job but never cached.
+    """
+    progress = progress or (lambda *args: None)
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text("text")
-        return text
+        text = pdf_extraction.extract_text(pdf_path, progress=lambda done, total: progress("extracting_text", done, total))
+        pages = text.split("\f")
+        scanned = [i + 1 for i, page in enumerate(pages) if len(page.strip()) < SCANNED_PAGE_CHARS]
+        if scanned:
+            logging.info(f"🔄 Running OCR on {len(scanned)} scanned page(s) of {len(pages)}")
+            try:
+                texts = ocr_engine.ocr_images(
+                    pdf_extraction.render_pages(pdf_path, scanned),
+                    cache=content_cache,
+                    cache_version=PIPELINE_VERSIONS["image_text"],
+                    progress=lambda done, total: progress("ocr", done, total),
+                    total=len(scanned),
+                )
+                for number, page_text in zip(scanned, texts):
+                    pages[number - 1] = page_text
+            except Exception as e:
+                # Keep whatever the text layer had rather than failing the whole PDF
+                logging.error(f"❌ OCR of scanned PDF pages failed: {e}")
+                return Incomplete("\f".join(pages), f"OCR failed for {len(scanned)} scanned page(s)")
+        return "\f".join(pages)
     except Exception as e:
         logging.error(f"❌ PDF text extraction failed: {e}")
         return ""
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-def extract_text_from_image(image_path: str) -> str:
-    """Extracts text from an image file using OCR."""
+def extract_text_from_images(image_paths: list, progress=None) -> str:
+    """
+    Extracts text from one or more image files using OCR, in parallel.
+    Images are separated by form feeds, like PDF pages.
+    """
+    def read_images():
+        for path in image_paths:
+            with open(path, "rb") as f:
+                yield f.read()
+
     try:
-        image = Image.open(image_path)
-        text = pytesseract.image_to_string(image)
-        return text
-    except pytesseract.TesseractNotFoundError:
-        logging.error("❌ Tesseract is not installed or not in your PATH.")
-        return ""
+        texts = ocr_engine.ocr_images(
+            read_images(),
+            cache=content_cache,
+            cache_version=PIPELINE_VERSIONS["image_text"],
+            progress=progress,
+            total=len(image_paths),
+        )
+        return "\f".join(texts)
     except Exception as e:
         logging.error(f"❌ Image text extraction failed: {e}")
         return ""
 
+def cached_text(kind, filepath, extract, **kwargs):
+    """extract(filepath, **kwargs), cached by the file's SHA-256 unless Incomplete. Returns (text, cache_hit)."""
+    key = ContentCache.key(file_digest(filepath), PIPELINE_VERSIONS[kind])
+    return content_cache.get_or_compute(kind, key, lambda: extract(filepath, **kwargs))
+
 # --- Corrected and updated video function ---
-def generate_flashcards_from_video_url(video_url: str, api_name: str, client) -> list:
-    """
-    Handles transcription and flashcard generation from any video URL.
-    """
+def transcribe_video_url(video_url: str, progress) -> str:
+    """Downloads a video's audio track with yt-dlp and transcribes it with Whisper."""
     temp_dir = 'temp_downloads'
     os.makedirs(temp_dir, exist_ok=True)
     
@@ -91,6 +171,7 @@ def generate_flashcards_from_video_url(video_url: str, api_name: str, client) ->
 
     try:
         logging.info(f"🔄 Starting audio download for video: {video_url}")
+        progress("downloading", 0.05)
         
         # We'll use yt-dlp to get the final filename as well
         info_command = [
@@ -122,20 +203,43 @@ def generate_flashcards_from_video_url(video_url: str, api_name: str, client) ->
         logging.info(f"✅ Audio downloaded to: {audio_path}")
 
         logging.info("🔄 Transcribing with Whisper...")
+        progress("transcribing", 0.3, title=video_info.get("title"))
         
-        # Load the Whisper model and transcribe the actual downloaded audio file
-        model = whisper.load_model("tiny")
+        # Get the (lazily loaded) Whisper model and transcribe the actual downloaded audio file
+        model = whisper_model.get()
+        if model is None:
+            logging.error(f"❌ Whisper model unavailable: {whisper_model.error}")
+            return ""
         transcription_result = model.transcribe(audio_path)
-        transcribed_text = transcription_result['text']
+        return transcription_result['text']
+    finally:
+        # This cleanup block is now safe from UnboundLocalError
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+            logging.info(f"🗑️ Cleaned up temporary audio file: {audio_path}")
+
+def generate_flashcards_from_video_url(video_url: str, api_name: str, client, progress=None) -> list:
+    """
+    Handles transcription and flashcard generation from any video URL.
+    `progress(stage, fraction, **partial)` is called as each stage starts.
+    Transcripts are cached by video id, so a repeated URL skips the download.
+    """
+    progress = progress or (lambda *args, **kwargs: None)
+    try:
+        key = ContentCache.key(video_id(video_url), PIPELINE_VERSIONS["transcript"])
+        transcribed_text, cached = content_cache.get_or_compute(
+            "transcript", key, lambda: transcribe_video_url(video_url, progress)
+        )
         
-        if not transcribed_text:
+        if not transcribed_text.strip():
             logging.warning("Transcription returned empty text.")
             return []
 
         logging.info("✅ Transcription complete. Generating flashcards with LLM...")
+        progress("generating_flashcards", 0.5, transcript_preview=transcribed_text[:500], cached_transcript=cached)
         
         # Pass the transcribed text to your existing function
-        flashcards = generate_flashcards_with_api(transcribed_text, api_name, client)
+        flashcards = generate_flashcards(transcribed_text, api_name, client, progress=progress)
         
         return flashcards
 
@@ -145,13 +249,42 @@ def generate_flashcards_from_video_url(video_url: str, api_name: str, client) ->
     except Exception as e:
         logging.error(f"❌ An error occurred during video processing: {e}")
         return []
-    finally:
-        # This cleanup block is now safe from UnboundLocalError
-        if audio_path and os.path.exists(audio_path):
-            os.remove(audio_path)
-            logging.info(f"🗑️ Cleaned up temporary audio file: {audio_path}")
 
-def generate_flashcards_with_api(summary: str, api_name: str, client) -> list:
+def generate_flashcards(text: str, api_name: str, client, progress=None) -> list:
+    """
+    Generates flashcards for text of any length. Text that fits in one chunk
+    is a single API call; longer text is split on page/section boundaries and
+    the chunks are generated in parallel, then merged and deduplicated.
+    Card sets are cached by the text's hash, so identical notes are sent to
+    the LLM once.
+    """
+    key = ContentCache.key(text_digest(text), api_name, FLASHCARD_CHUNK_TOKENS, PIPELINE_VERSIONS["flashcards"])
+    flashcards, cached = content_cache.get_or_compute(
+        "flashcards", key, lambda: generate_flashcards_uncached(text, api_name, client, progress)
+    )
+    if cached:
+        logging.info("⚡ Flashcards served from the content cache.")
+        if progress:
+            progress("generating_flashcards", 1.0, cached_flashcards=True)
+    return flashcards
+
+def generate_flashcards_uncached(text: str, api_name: str, client, progress=None) -> list:
+    if len(split_into_chunks(text, FLASHCARD_CHUNK_TOKENS)) <= 1:
+        return generate_flashcards_with_api(text, api_name, client)
+
+    def report(done, total, cards):
+        if progress:
+            progress("generating_flashcards", 0.5 + 0.5 * done / total, chunks_done=done, chunks_total=total, cards_so_far=cards)
+
+    return generate_chunked(
+        text,
+        lambda chunk, min_cards: generate_flashcards_with_api(chunk, api_name, client, min_cards=min_cards),
+        max_workers=FLASHCARD_CHUNK_PARALLELISM,
+        chunk_tokens=FLASHCARD_CHUNK_TOKENS,
+        progress=report,
+    )
+
+def generate_flashcards_with_api(summary: str, api_name: str, client, min_cards: int = 15) -> list:
     """
     Generates flashcards using a specified API client with robust JSON parsing.
     """
@@ -159,7 +292,7 @@ def generate_flashcards_with_api(summary: str, api_name: str, client) -> list:
     You are an expert educator and flashcard creator. Your task is to generate a comprehensive set of flashcards from the provided notes summary. Each flashcard should test a key concept, fact, or definition.
 
     **Instructions:**
-    1.  Generate at least **15** unique flashcards.
+    1.  Generate at least **{min_cards}** unique flashcards.
     2.  Each flashcard must be a JSON object with two keys: "question" and "answer".
     3.  The questions should be thought-provoking, not just simple recall. Include "Why," "How," or "Explain" questions.
     4.  The answers should be concise but complete, providing the core information needed.
@@ -243,13 +376,90 @@ def generate_flashcards_with_api(summary: str, api_name: str, client) -> list:
 
     return None
 
+# =====================================================
+# 🔹 BACKGROUND PIPELINES
+# =====================================================
+def flashcard_result(flashcards, message, **extra):
+    """Job result for generated flashcards (an empty result fails the job)."""
+    if not flashcards:
+        raise RuntimeError("Gemini API failed to generate flashcards.")
+    return {"message": message, "flashcards": flashcards, **extra}
+
+def pdf_flashcards_job(job, filepath):
+    job.update("extracting_text", 0.1)
+    stages = {"extracting_text": 0.1, "ocr": 0.3}  # each stage fills 0.2 of the bar
+
+    def report(stage, done, total):
+        job.update(stage, stages[stage] + 0.2 * done / total, pages_done=done, pages_total=total)
+
+    extracted_text, cached = cached_text("pdf_text", filepath, extract_text_from_pdf, progress=report)
+    if not extracted_text.strip():
+        raise RuntimeError("No extractable text found in the PDF.")
+    job.update("generating_flashcards", 0.5, characters=len(extracted_text), cached_text=cached)
+    flashcards = generate_flashcards(extracted_text, 'gemini', api_clients['gemini'], progress=job.update)
+    return flashcard_result(flashcards, "Flashcards generated successfully!")
+
+def text_flashcards_job(job, text_input):
+    job.update("generating_flashcards", 0.2, characters=len(text_input))
+    flashcards = generate_flashcards(text_input, 'gemini', api_clients['gemini'], progress=job.update)
+    return flashcard_result(flashcards, "Flashcards generated successfully!")
+
+def image_flashcards_job(job, filepaths):
+    job.update("ocr", 0.1)
+
+    def report(done, total):
+        job.update("ocr", 0.1 + 0.4 * done / total, images_done=done, images_total=total)
+
+    extracted_text = extract_text_from_images(filepaths, progress=report)
+    if not extracted_text.strip():
+        raise RuntimeError("Failed to extract text from the image(s).")
+    job.update("generating_flashcards", 0.5, characters=len(extracted_text))
+    flashcards = generate_flashcards(extracted_text, 'gemini', api_clients['gemini'], progress=job.update)
+    return flashcard_result(flashcards, "Flashcards generated successfully!")
+
+def video_flashcards_job(job, video_url):
+    flashcards = generate_flashcards_from_video_url(video_url, 'gemini', api_clients['gemini'], progress=job.update)
+    return flashcard_result(flashcards, "Flashcards generated successfully from video!", source_url=video_url)
+
+def save_upload(file):
+    """Saves an uploaded file under a unique name (jobs may overlap) and returns its path."""
+    temp_dir = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    os.makedirs(temp_dir, exist_ok=True)
+    filepath = os.path.join(temp_dir, f"{uuid.uuid4().hex}_{secure_filename(file.filename)}")
+    file.save(filepath)
+    return filepath
+
+def remove_upload(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+        logging.info(f"🗑️ Cleaned up temporary file: {filepath}")
+
+def queue_generation(kind, pipeline, *args, cleanup=None):
+    """Queues a pipeline for the current user; 202 with the job id, or 429 when over the limits."""
+    try:
+        job = flashcard_jobs.submit(str(get_jwt_identity()), kind, pipeline, *args, cleanup=cleanup)
+    except JobRejected as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}"}), 202
+
 # =====================================================
 # 🔹 API ROUTE
 # =====================================================
+@flashai_bp.route("/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    """Reports a generation job's status, progress, partial results and final result."""
+    job = flashcard_jobs.get(job_id)
+    if not job or job.owner != str(get_jwt_identity()):
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
 @flashai_bp.route("/upload_notes", methods=["POST"])
 @jwt_required()
 def upload_notes():
-    """Handles PDF upload, extracts text, and generates flashcards using Gemini."""
+    """Handles PDF upload and queues text extraction and flashcard generation with Gemini."""
     current_user_id = get_jwt_identity()
     if 'gemini' not in api_clients:
         return jsonify({"error": "Gemini API key is not configured. Please check your .env file."}), 503
@@ -262,35 +472,14 @@ def upload_notes():
         return jsonify({"error": "No selected file"}), 400
 
     if file and file.filename.endswith('.pdf'):
-        filename = secure_filename(file.filename)
-        temp_dir = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-        os.makedirs(temp_dir, exist_ok=True)
-        filepath = os.path.join(temp_dir, filename)
-
         try:
-            logging.info(f"🔄 Starting flashcard generation from PDF: {filename}")
-            file.save(filepath)
-            extracted_text = extract_text_from_pdf(filepath)
-            if not extracted_text:
-                return jsonify({"error": "Failed to extract text from PDF."}), 500
-
-            flashcards = generate_flashcards_with_api(extracted_text, 'gemini', api_clients['gemini'])
-            if flashcards:
-                logging.info(f"✅ Flashcards generated successfully from {filename}.")
-                return jsonify({
-                    "message": "Flashcards generated successfully!",
-                    "flashcards": flashcards,
-                })
-            else:
-                return jsonify({"error": "Gemini API failed to generate flashcards."}), 500
-
+            filepath = save_upload(file)
         except Exception as e:
-            logging.error(f"❌ An error occurred during PDF-based flashcard generation: {str(e)}")
+            logging.error(f"❌ Could not save uploaded PDF: {str(e)}")
             return jsonify({"error": f"An error occurred: {str(e)}"}), 500
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                logging.info(f"🗑️ Cleaned up temporary PDF file: {filepath}")
+
+        logging.info(f"🔄 Queuing flashcard generation from PDF: {file.filename}")
+        return queue_generation("pdf", pdf_flashcards_job, filepath, cleanup=lambda: remove_upload(filepath))
     else:
         return jsonify({"error": "Invalid file type. Please upload a PDF."}), 400
 
@@ -453,8 +642,8 @@ def add_card_to_deck(deck_id):
 @jwt_required()
 def generate_from_text(user_id):
     """
-    Handles text input from the frontend, generates flashcards using Gemini,
-    and returns the result.
+    Handles text input from the frontend and queues flashcard generation
+    with Gemini; the result is collected from /api/jobs/<id>.
     """
     current_user_id = get_jwt_identity()
     if int(current_user_id) != user_id:
@@ -470,16 +659,8 @@ def generate_from_text(user_id):
         if not text_input:
             return jsonify({"error": "No text provided in the request body"}), 400
         
-        logging.info("🔄 Starting flashcard generation from text.")
-        flashcards = generate_flashcards_with_api(text_input, 'gemini', api_clients['gemini'])
-        if flashcards:
-            logging.info("✅ Flashcards generated successfully from text.")
-            return jsonify({
-                "message": "Flashcards generated successfully!",
-                "flashcards": flashcards,
-            })
-        else:
-            return jsonify({"error": "Gemini API failed to generate flashcards."}), 500
+        logging.info("🔄 Queuing flashcard generation from text.")
+        return queue_generation("text", text_flashcards_job, text_input)
 
     except Exception as e:
         logging.error(f"❌ An error occurred during text-based flashcard generation: {str(e)}")
@@ -489,8 +670,9 @@ def generate_from_text(user_id):
 @jwt_required()
 def upload_image(user_id):
     """
-    Handles image upload, extracts text via OCR, and generates flashcards
-    using Gemini.
+    Handles upload of one or more images (form field "files", or "file")
+    and queues OCR and flashcard generation with Gemini; the result is
+    collected from /api/jobs/<id>.
     """
     current_user_id = get_jwt_identity()
     if int(current_user_id) != user_id:
@@ -499,52 +681,43 @@ def upload_image(user_id):
     if 'gemini' not in api_clients:
         return jsonify({"error": "Gemini API key is not configured. Please check your .env file."}), 503
 
-    if 'file' not in request.files:
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
         return jsonify({"error": "No file part in the request"}), 400
 
-    file = request.files['file']
-    if file.filename == '':
+    if any(file.filename == '' for file in files):
         return jsonify({"error": "No selected file"}), 400
 
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
-    if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-        return jsonify({"error": "Invalid file type. Please upload an image (PNG, JPG, JPEG, GIF, BMP)."}), 400
+    if len(files) > MAX_IMAGES_PER_REQUEST:
+        return jsonify({"error": f"Please upload at most {MAX_IMAGES_PER_REQUEST} images at a time."}), 400
 
-    filename = secure_filename(file.filename)
-    temp_dir = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-    os.makedirs(temp_dir, exist_ok=True)
-    filepath = os.path.join(temp_dir, filename)
+    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+    for file in files:
+        if not ('.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+            return jsonify({"error": "Invalid file type. Please upload images (PNG, JPG, JPEG, GIF, BMP, WebP, TIFF)."}), 400
 
+    filepaths = []
     try:
-        logging.info(f"🔄 Starting flashcard generation from image: {filename}")
-        file.save(filepath)
-        extracted_text = extract_text_from_image(filepath)
-        if not extracted_text:
-            return jsonify({"error": "Failed to extract text from the image."}), 500
-
-        flashcards = generate_flashcards_with_api(extracted_text, 'gemini', api_clients['gemini'])
-        if flashcards:
-            logging.info(f"✅ Flashcards generated successfully from {filename}.")
-            return jsonify({
-                "message": "Flashcards generated successfully!",
-                "flashcards": flashcards,
-            })
-        else:
-            return jsonify({"error": "Gemini API failed to generate flashcards."}), 500
-
+        for file in files:
+            filepaths.append(save_upload(file))
     except Exception as e:
-        logging.error(f"❌ An error occurred during image-based flashcard generation: {str(e)}")
+        logging.error(f"❌ Could not save uploaded image: {str(e)}")
+        for filepath in filepaths:
+            remove_upload(filepath)
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            logging.info(f"🗑️ Cleaned up temporary image file: {filepath}")
+
+    def cleanup():
+        for filepath in filepaths:
+            remove_upload(filepath)
+
+    logging.info(f"🔄 Queuing flashcard generation from {len(files)} image(s): {', '.join(f.filename for f in files)}")
+    return queue_generation("image", image_flashcards_job, filepaths, cleanup=cleanup)
 
 @flashai_bp.route("/generate_from_video/<int:user_id>", methods=["POST"])
 @jwt_required()
 def generate_from_video_route(user_id):
     """
-    API endpoint to generate flashcards from a video URL using Gemini.
+    API endpoint to queue flashcard generation from a video URL using Gemini.
     """
     current_user_id = get_jwt_identity()
     if int(current_user_id) != user_id:
@@ -560,18 +733,8 @@ def generate_from_video_route(user_id):
         if not video_url:
             return jsonify({"error": "No video URL provided"}), 400
 
-        logging.info(f"🔄 Starting flashcard generation from video URL: {video_url}")
-        # Correctly call the helper function with the required 'api_name' argument
-        flashcards = generate_flashcards_from_video_url(video_url, 'gemini', api_clients['gemini'])
-        if flashcards:
-            logging.info(f"✅ Flashcards generated successfully from video.")
-            return jsonify({
-                "message": "Flashcards generated successfully from video!",
-                "flashcards": flashcards,
-                "source_url": video_url
-            })
-        else:
-            return jsonify({"error": "Gemini API failed to generate flashcards."}), 500
+        logging.info(f"🔄 Queuing flashcard generation from video URL: {video_url}")
+        return queue_generation("video", video_flashcards_job, video_url)
 
     except Exception as e:
         logging.error(f"❌ An unexpected error occurred in video route: {str(e)}")
@@ -0,0 +1,140 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def state_bytes(state):
+    """Memory held by a llama.cpp state: the KV data plus its token and logit arrays."""
+    if state is None:
+        return 0
+    size = getattr(state, "llama_state_size", 0)
+    for name in ("scores", "input_ids"):
+        size += getattr(getattr(state, name, None), "nbytes", 0)
+    return size
+
+
+class Session:
+    """Server-side conversation state for one chat session."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.messages = []      # [{"role": ..., "content": ...}] without system messages
+        self.kv_state = None    # llama.cpp state after the last LLM turn (local mode only)
+        self.turns = 0          # exchanges recorded, so clients can tell whether the session is the one they built
+        self.last_used = time.monotonic()
+
+    @property
+    def kv_bytes(self):
+        return state_bytes(self.kv_state)
+
+    @property
+    def message_bytes(self):
+        return sum(sys.getsizeof(m.get("content", "")) for m in self.messages)
+
+
+class SessionStore:
+    """
+    LRU store of conversation sessions keyed by session_id and owned by
+    one authenticated user.
+
+    Holds the message list (so clients don't resend history) and the
+    llama.cpp KV state after the last LLM turn (so a follow-up only
+    evaluates the new message). Sessions idle longer than `idle_ttl` are
+    dropped. Over the memory budget, the least recently used sessions lose
+    their KV state first (cheap to rebuild), then the sessions themselves.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, idle_ttl=1800, max_messages=200):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.kv_evictions = 0
+        self.session_evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.expirations += 1
+
+    def _bytes(self):
+        return sum(s.kv_bytes + s.message_bytes for s in self._sessions.values())
+
+    def _enforce_budget(self):
+        total = self._bytes()
+        for session in self._sessions.values():
+            if total <= self.max_bytes:
+                return
+            if session.kv_state is not None:
+                total -= session.kv_bytes
+                session.kv_state = None
+                self.kv_evictions += 1
+        while total > self.max_bytes and len(self._sessions) > 1:
+            _, session = self._sessions.popitem(last=False)
+            total -= session.message_bytes
+            self.session_evictions += 1
+
+    def get(self, session_id, owner):
+        """Return the live session for this owner, or None."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def history(self, session_id, owner):
+        session = self.get(session_id, owner)
+        return [dict(m) for m in session.messages] if session else []
+
+    def kv_state(self, session_id, owner):
+        session = self.get(session_id, owner)
+        return session.kv_state if session else None
+
+    def record_turn(self, session_id, owner, user_input, bot_response, kv_state=None, history=None):
+        """
+        Append one user/assistant exchange.
+
+        `history` (when the client sent one) replaces the stored messages
+        first. `kv_state` replaces the stored state when the turn came from
+        the model; otherwise the old state is kept, since llama.cpp only
+        reuses the token prefix that still matches.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.owner != owner:
+                session = Session(owner)
+                self._sessions[session_id] = session
+            if history is not None:
+                session.messages = [dict(m) for m in history if m.get("role") != "system"]
+                session.turns = sum(1 for m in session.messages if m.get("role") == "user")
+            session.messages.append({"role": "user", "content": user_input})
+            session.messages.append({"role": "assistant", "content": bot_response})
+            session.turns += 1
+            del session.messages[:-self.max_messages]
+            if kv_state is not None:
+                session.kv_state = kv_state
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self._enforce_budget()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "with_kv_state": sum(1 for s in self._sessions.values() if s.kv_state is not None),
+                "bytes": self._bytes(),
+                "max_bytes": self.max_bytes,
+                "kv_evictions": self.kv_evictions,
+                "session_evictions": self.session_evictions,
+                "expirations": self.expirations,
+            }
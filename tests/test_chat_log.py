@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from chat_log import ChatLogIndex, ChatLogWriter, log_files
+
+
+def write_entries(path, worker, count, max_bytes):
+    # Rare syncs, so a buffered writer would flush mid-line
+    writer = ChatLogWriter(path, max_bytes=max_bytes, fsync_every=1000, fsync_interval=10)
+    for i in range(count):
+        writer.write({"id": f"{worker}-{i}", "user_message": "x" * 200})
+    writer.close()
+
+
+def read_lines(path):
+    lines = []
+    for log_file in log_files(path):
+        with open(log_file, "r", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+def test_entries_are_json_lines_and_rotate_by_size(tmp_path):
+    path = str(tmp_path / "chat_logs.jsonl")
+    write_entries(path, "w", 50, max_bytes=2000)
+    entries = [json.loads(line) for line in read_lines(path)]
+    assert [e["id"] for e in entries] == [f"w-{i}" for i in range(50)]
+    assert len(log_files(path)) > 1
+
+
+def test_processes_sharing_a_log_never_split_lines(tmp_path):
+    path = str(tmp_path / "chat_logs.jsonl")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=write_entries, args=(path, w, 500, 50000)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    ids = [json.loads(line)["id"] for line in read_lines(path)]  # a torn line would fail to parse
+    assert sorted(ids) == sorted(f"{w}-{i}" for w in range(4) for i in range(500))
+    assert 2 <= len(log_files(path)) <= 4 * 500 * 240 // 50000 + 2  # one rotation per size step, not per worker
+
+
+def entry(i, **fields):
+    return dict({"id": str(i), "session_id": f"s{i % 3}", "username": "asha", "intent": "llm_fallback",
+                 "source": "llama", "timestamp": f"2026-10-{1 + i // 10:02d}T10:{i % 60:02d}:00"}, **fields)
+
+
+def append(path, entries):
+    with open(path, "a", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(e) + "\n")
+
+
+@pytest.fixture
+def index(tmp_path):
+    log_path = str(tmp_path / "chat_logs.jsonl")
+    legacy_path = str(tmp_path / "chat_logs.json")
+    with open(legacy_path, "w", encoding="utf-8") as f:
+        json.dump([entry(i) for i in range(5)], f)
+    # Three rotated files and the live one
+    for n, start in enumerate(range(5, 50, 15)):
+        append(str(tmp_path / f"chat_logs.2026100{n}-000000-000000.jsonl"), [entry(i) for i in range(start, start + 15)])
+    append(log_path, [entry(i) for i in range(50, 60)])
+    idx = ChatLogIndex(str(tmp_path / "index.sqlite3"), log_path=log_path, legacy_path=legacy_path)
+    assert idx.refresh() == 60
+    return idx, log_path
+
+
+def walk(idx, **kwargs):
+    ids, cursor = [], None
+    while True:
+        lines, cursor = idx.query(cursor=cursor, **kwargs)
+        ids.extend(json.loads(line)["id"] for line in lines)
+        if cursor is None:
+            return ids
+
+
+def test_cursor_walk_covers_every_entry_once(index):
+    idx, _ = index
+    assert walk(idx, limit=7, newest_first=False) == [str(i) for i in range(60)]
+    assert walk(idx, limit=7) == [str(i) for i in reversed(range(60))]
+
+
+def test_filters_and_since_bound(index):
+    idx, _ = index
+    assert walk(idx, filters={"session_id": "s1"}, limit=4) == [str(i) for i in reversed(range(60)) if i % 3 == 1]
+    assert walk(idx, since="2026-10-05T00:00:00", limit=100, newest_first=False) == [str(i) for i in range(40, 60)]
+    assert walk(idx, filters={"not_a_column": "x"}, limit=100) == walk(idx, limit=100)
+
+
+def test_refresh_reads_only_appended_lines_and_follows_rotation(index, tmp_path):
+    idx, log_path = index
+    assert idx.refresh() == 0
+    append(log_path, [entry(60)])
+    os.replace(log_path, str(tmp_path / "chat_logs.20261009-000000-000000.jsonl"))  # rotated after indexing
+    append(log_path, [entry(61)])
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write('{"id": "partial"')  # still being written
+    assert idx.refresh() == 2
+    assert idx.refresh() == 0
+    assert walk(idx, limit=100)[:2] == ["61", "60"]
@@ -0,0 +1,55 @@
+from chunked_generation import deduplicate, generate_chunked, split_into_chunks
+from context_budget import estimate_tokens
+
+
+def page(n, words=40):
+    return " ".join(f"p{n}w{i}" for i in range(words)) + "."
+
+
+def test_chunks_break_on_page_boundaries():
+    text = "\f".join(page(n) for n in range(6))
+    chunks = split_into_chunks(text, max_tokens=120)
+    assert len(chunks) == 3
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 120
+        starts = {word[:2] for word in chunk.split()}
+        assert len(starts) == 2  # two whole pages, never a page split across chunks
+    assert " ".join(chunks).split() == text.replace("\f", " ").split()
+
+
+def test_numbered_headings_start_sections():
+    text = "1. Fundamental Rights\n" + page(0) + "\n2. Directive Principles\n" + page(1)
+    chunks = split_into_chunks(text, max_tokens=60)
+    assert chunks[0].startswith("1. Fundamental Rights")
+    assert chunks[1].startswith("2. Directive Principles")
+
+
+def test_oversized_section_is_split_by_words():
+    text = page(0, words=500)
+    chunks = split_into_chunks(text, max_tokens=100)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_deduplicate_keeps_distinct_answers():
+    cards = [
+        {"question": "What is Article 14?", "answer": "Equality before law."},
+        {"question": "What is Article 21?", "answer": "Protection of life and personal liberty."},
+        {"question": "What is article 14", "answer": "Equality before law"},
+    ]
+    assert deduplicate(cards) == cards[:2]
+
+
+def test_generate_chunked_merges_in_order_and_skips_failures():
+    text = "\f".join(page(n) for n in range(3))
+
+    def generate(chunk, min_cards):
+        first = chunk.split()[0][:2]
+        if first == "p1":
+            raise RuntimeError("model error")
+        return [{"question": f"Question about {first}?", "answer": first}]
+
+    deck = generate_chunked(text, generate, chunk_tokens=60)
+    assert [card["answer"] for card in deck] == ["p0", "p2"]
+    assert generate_chunked(text, lambda chunk, n: [], chunk_tokens=60) is None
@@ -0,0 +1,81 @@
+import os
+import time
+
+import pytest
+
+from content_cache import ContentCache, Incomplete, video_id
+
+
+def entry_size(value):
+    return len(f'"{value}"'.encode("utf-8"))
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    value = "x" * 100
+    cache = ContentCache(str(tmp_path), max_bytes=entry_size(value) * 2)
+    cache.set("text", "a", value)
+    cache.set("text", "b", value)
+    assert cache.get("text", "a") == value
+    cache.set("text", "c", value)
+    assert cache.get("text", "b") is None
+    assert cache.get("text", "a") == value
+    assert cache.get("text", "c") == value
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(cache._path("text", "b"))
+
+
+def test_order_survives_a_restart(tmp_path):
+    value = "y" * 100
+    first = ContentCache(str(tmp_path), max_bytes=entry_size(value) * 2)
+    first.set("text", "old", value)
+    first.set("text", "new", value)
+    past = time.time() - 60
+    os.utime(first._path("text", "old"), (past, past))
+
+    restarted = ContentCache(str(tmp_path), max_bytes=entry_size(value) * 2)
+    restarted.set("text", "newest", value)
+    assert restarted.get("text", "old") is None
+    assert restarted.get("text", "new") == value
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = ContentCache(str(tmp_path))
+    assert cache.get_or_compute("cards", "k", lambda: []) == ([], False)
+    assert cache.get_or_compute("cards", "k", lambda: [{"q": 1}]) == ([{"q": 1}], False)
+    assert cache.get_or_compute("cards", "k", lambda: pytest.fail("recomputed")) == ([{"q": 1}], True)
+
+
+def test_key_depends_on_every_part():
+    assert ContentCache.key("sha", "v1") != ContentCache.key("sha", "v2")
+    assert ContentCache.key("a", "bc") != ContentCache.key("ab", "c")
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://m.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ#start",
+])
+def test_youtube_urls_share_an_id(url):
+    assert video_id(url) == "youtube:dQw4w9WgXcQ"
+
+
+def test_other_urls_are_normalized():
+    assert video_id("HTTPS://Example.com/Talk.mp4#t=10") == "https://example.com/Talk.mp4"
+
+
+def test_whitespace_only_text_is_not_cached(tmp_path):
+    cache = ContentCache(str(tmp_path))
+    assert cache.get_or_compute("pdf_text", "k", lambda: "\f\f") == ("\f\f", False)
+    assert cache.get("pdf_text", "k") is None
+    assert cache.get_or_compute("pdf_text", "k", lambda: "page one\fpage two") == ("page one\fpage two", False)
+    assert cache.get_or_compute("pdf_text", "k", lambda: pytest.fail("recomputed"))[1] is True
+
+
+def test_incomplete_results_are_used_but_not_cached(tmp_path):
+    cache = ContentCache(str(tmp_path))
+    degraded = Incomplete("text layer\f", "OCR failed for 1 scanned page(s)")
+    assert cache.get_or_compute("pdf_text", "k", lambda: degraded) == ("text layer\f", False)
+    assert cache.get("pdf_text", "k") is None
+    assert cache.get_or_compute("pdf_text", "k", lambda: "text layer\focr text") == ("text layer\focr text", False)
+    assert cache.get("pdf_text", "k") == "text layer\focr text"
@@ -0,0 +1,92 @@
+from context_budget import MESSAGE_OVERHEAD, REPLY_OVERHEAD, TokenCounter, extractive_summary, fit_messages
+
+
+def words(n, tag="w"):
+    return " ".join(f"{tag}{i}" for i in range(n))
+
+
+def msg(role, content):
+    return {"role": role, "content": content}
+
+
+def counter():
+    return TokenCounter(tokenize=str.split)  # one token per word
+
+
+SYSTEM = [msg("system", words(10, "s")), msg("system", "The student you are helping is Asha.")]
+
+
+def conversation(turns, size=20):
+    messages = []
+    for i in range(turns):
+        messages.append(msg("user", f"Question {i}? " + words(size)))
+        messages.append(msg("assistant", f"Answer {i}. " + words(size)))
+    return messages
+
+
+def test_everything_fits():
+    messages = SYSTEM + conversation(2)
+    fitted, evicted = fit_messages(messages, 1000, counter())
+    assert fitted == messages
+    assert evicted == []
+
+
+def test_oldest_turns_are_dropped_and_system_head_kept():
+    c = counter()
+    turns = conversation(5)
+    messages = SYSTEM + turns
+    budget = c.total(SYSTEM) + sum(c.count(m) for m in turns[-3:])
+    fitted, evicted = fit_messages(messages, budget, c)
+    assert fitted == SYSTEM + turns[-3:]
+    assert evicted == turns[:-3]
+    assert c.total(fitted) <= budget
+
+
+def test_oversized_newest_turn_is_still_kept():
+    c = counter()
+    newest = msg("user", words(500))
+    messages = SYSTEM + conversation(2) + [newest]
+    fitted, evicted = fit_messages(messages, c.total(SYSTEM) + 50, c)
+    assert fitted == SYSTEM + [newest]
+    assert len(evicted) == 4
+
+
+def test_summary_of_dropped_questions_is_inserted_after_system_head():
+    c = counter()
+    turns = conversation(6)
+    messages = SYSTEM + turns
+    budget = c.total(SYSTEM) + sum(c.count(m) for m in turns[-4:])
+    fitted, evicted = fit_messages(messages, budget, c, summarize=extractive_summary, summary_tokens=40)
+    summary = fitted[len(SYSTEM)]
+    assert fitted[:len(SYSTEM)] == SYSTEM
+    assert summary["role"] == "system"
+    assert summary["content"].startswith("Earlier in this conversation the student asked about: ")
+    assert "Question 0?" in summary["content"]
+    assert fitted[len(SYSTEM) + 1:] == turns[len(evicted):]
+    assert c.total(fitted) <= budget
+    assert len(evicted) > len(turns) - 4  # room was made for the summary
+
+
+def test_summary_keeps_most_recent_questions_within_budget():
+    c = counter()
+    evicted = conversation(10, size=2)
+    summary = extractive_summary(evicted, c, max_tokens=30)
+    assert summary.endswith("Question 9?")
+    assert "Question 0?" not in summary
+    assert c.count(msg("system", summary)) <= 30
+
+
+def test_counts_are_cached_per_message():
+    c = counter()
+    m = msg("user", "hello there")
+    assert c.count(m) == 2 + MESSAGE_OVERHEAD
+    c.count(m)
+    assert c.stats()["hits"] == 1
+    assert c.total([m]) == 2 + MESSAGE_OVERHEAD + REPLY_OVERHEAD
+
+
+def test_estimates_without_tokenizer_are_not_cached():
+    c = TokenCounter()
+    c.count(msg("user", "one two three"))
+    assert c.stats()["cached_messages"] == 0
+    assert c.stats()["estimated"] == 1
@@ -0,0 +1,137 @@
+import json
+import os
+
+import pytest
+from rapidfuzz import fuzz, process
+
+from intent_index import IntentIndex, parse_classify_request
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chats_dataset.json")
+
+with open(DATASET, "r", encoding="utf-8") as f:
+    INTENTS = json.load(f)["intents"]
+
+QUESTIONS = [
+    "what time is it",
+    "what is the date today",
+    "What is your age",
+    "who developed u?",
+    "Tell me more abuot Prep",
+    "How can you help me study?",
+    "Do you remember my chats?",
+    "Are your answers correct?",
+    "whats the tiem",
+    "helo there",
+    # Went to the LLM with the original matcher and must keep doing so
+    "what is time dilation",
+    "what is preamble",
+    "what exactly is inflation",
+    "how old is the universe",
+    "what is photosynthesis exactly",
+]
+
+
+def baseline_intent(user_input, threshold=70):
+    """The matcher IntentIndex replaced (router/bot_routes.py find_intent before the index)."""
+    all_patterns = [(p, intent) for intent in INTENTS for p in intent["patterns"]]
+    match, score, _ = process.extractOne(user_input, [p[0] for p in all_patterns], scorer=fuzz.token_sort_ratio)
+    if score >= threshold:
+        for p, intent in all_patterns:
+            if p == match:
+                return intent["tag"], score
+    return None, score
+
+
+@pytest.fixture(scope="module")
+def index():
+    return IntentIndex(INTENTS)
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_exhaustive_match_agrees_with_baseline(index, question):
+    tag, score = baseline_intent(question)
+    intent, index_score, _ = index.match(question, mode="exhaustive")
+    assert (intent["tag"] if intent else None) == tag
+    assert index_score == pytest.approx(score)
+
+
+def test_every_pattern_scores_like_baseline(index):
+    for intent in INTENTS:
+        for pattern in intent["patterns"][:10]:
+            tag, score = baseline_intent(pattern)
+            matched, index_score, _ = index.match(pattern, mode="exhaustive")
+            assert (matched["tag"] if matched else None) == tag, pattern
+            assert index_score == pytest.approx(score), pattern
+
+
+@pytest.mark.parametrize("question", ["what is time dilation", "how old is the universe"])
+def test_topic_questions_are_not_intents(index, question):
+    intent, _, _ = index.match(question, mode="prefilter")
+    assert intent is None
+
+
+MISSPELT = [
+    "wat is the tiem now",
+    "whta is your age",
+    "who devloped you",
+    "tel me more about prep",
+    "can u help me studdy",
+    "do you rember my chats",
+    "are yuor answers allways correct",
+    "waht's todays date",
+]
+
+
+@pytest.mark.parametrize("top_k", [10, 50])
+def test_prefilter_matches_exhaustive(index, top_k):
+    queries = [p for intent in INTENTS for p in intent["patterns"]] + MISSPELT + QUESTIONS
+    for query in queries:
+        exhaustive = index.match(query, mode="exhaustive")
+        prefilter = index.match(query, mode="prefilter", top_k=top_k)
+        assert (prefilter[0] or {}).get("tag") == (exhaustive[0] or {}).get("tag"), query
+        if exhaustive[0] is None:
+            assert prefilter[1:] == exhaustive[1:], query  # same diagnostics below the threshold
+
+
+def test_classify_batch_matches_match(index):
+    queries = QUESTIONS + MISSPELT
+    results = index.classify_batch(queries, workers=1)
+    for query, result in zip(queries, results):
+        intent, score, pattern = index.match(query, mode="exhaustive")
+        assert result["tag"] == (intent["tag"] if intent else None), query
+        assert result["score"] == pytest.approx(score), query
+        assert result["pattern"] == pattern, query
+
+
+def test_classify_batch_chunks_keep_order(index):
+    queries = QUESTIONS + MISSPELT
+    whole = index.classify_batch(queries, workers=1)
+    assert index.classify_batch(queries, workers=1, chunk_size=3) == whole
+    assert index.classify_batch(queries, workers=1, chunk_size=1) == whole
+    assert len(whole) == len(queries)
+
+
+def test_classify_batch_on_empty_index():
+    assert IntentIndex([]).classify_batch(["hi"]) == [{"tag": None, "score": 0.0, "pattern": None}]
+
+
+@pytest.mark.parametrize("body", [{"utterances": "what time is it"}, {"utterances": ["ok", 3]}, {}, []])
+def test_classify_request_needs_a_list_of_strings(body):
+    with pytest.raises(ValueError, match="'utterances' as a list of strings"):
+        parse_classify_request(body, max_batch=10)
+
+
+def test_classify_request_batch_limit():
+    with pytest.raises(ValueError, match="At most 2 utterances"):
+        parse_classify_request({"utterances": ["a", "b", "c"]}, max_batch=2)
+
+
+@pytest.mark.parametrize("threshold", ["high", True, -1, 101, None, [70]])
+def test_classify_request_rejects_bad_threshold(threshold):
+    with pytest.raises(ValueError, match="'threshold' must be a number between 0 and 100"):
+        parse_classify_request({"utterances": ["hi"], "threshold": threshold}, max_batch=10)
+
+
+def test_classify_request_defaults_and_numeric_strings():
+    assert parse_classify_request({"utterances": ["hi"]}, max_batch=10) == (["hi"], 70.0)
+    assert parse_classify_request({"utterances": [], "threshold": "85.5"}, max_batch=10) == ([], 85.5)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import INTERRUPTED, Job, JobManager, JobRejected, JobStore
+
+
+def wait_for(job_id, manager, status=Job.SUCCEEDED, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job is not None and job.status == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_manager(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "sqlite":
+            kwargs["db_path"] = str(tmp_path / "jobs.sqlite3")
+        return JobManager(**kwargs)
+    return make
+
+
+def test_per_user_limit(make_manager):
+    manager = make_manager(workers=1, per_user=1)
+    release = threading.Event()
+    cleaned = []
+    manager.submit("alice", "pdf", lambda job: release.wait(5))
+    with pytest.raises(JobRejected):
+        manager.submit("alice", "pdf", lambda job: None, cleanup=lambda: cleaned.append(True))
+    assert cleaned == [True]
+    other = manager.submit("bob", "pdf", lambda job: "ok")
+    release.set()
+    assert wait_for(other.id, manager).result == "ok"
+    assert manager.stats()["rejected"] == 1
+
+
+def test_finished_jobs_are_pruned(make_manager):
+    manager = make_manager(workers=1, per_user=10, history=2)
+    ids = []
+    for i in range(3):
+        ids.append(manager.submit("alice", "text", lambda job, i=i: i).id)
+        wait_for(ids[-1], manager)
+    manager.submit("alice", "text", lambda job: None)  # prunes on submit
+    assert manager.get(ids[0]) is None
+    assert manager.get(ids[2]).result == 2
+
+
+def test_other_process_reads_job_from_store(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    manager = JobManager(workers=1, db_path=db_path)
+    job = manager.submit("alice", "text", lambda job: job.update("generating", 0.5) or {"cards": [1]})
+    wait_for(job.id, manager)
+
+    other = JobManager(db_path=db_path)
+    stored = other.get(job.id)
+    assert stored.owner == "alice"
+    assert stored.to_dict()["result"] == {"cards": [1]}
+    assert stored.progress == 1.0
+
+
+def test_jobs_of_a_dead_process_fail(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db_path)
+    store.process = "999999999:0"  # recorded by a process that no longer exists
+    job = Job("alice", "pdf")
+    store.save(job)
+
+    restarted = JobManager(per_user=1, db_path=db_path)
+    stored = restarted.get(job.id)
+    assert stored.status == Job.FAILED
+    assert stored.error == INTERRUPTED
+    assert restarted.submit("alice", "pdf", lambda job: None)  # no longer counts against the limit
+
+
+def test_process_token_detects_pid_reuse():
+    token = jobs._process_token()
+    assert jobs._process_alive(token)
+    pid = token.split(":")[0]
+    assert not jobs._process_alive(f"{pid}:0")
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from knowledge_base import KnowledgeBase, is_typo, proper_tokens
+
+ENTRIES = [
+    {"question": "what is the capital of india", "answer": "New Delhi is the capital of India."},
+    {"question": "what is the capital of Russia", "answer": "The capital of Russia is Moscow."},
+    {"question": "tell me the capital of iran", "answer": "Tehran is the capital of Iran."},
+    {"question": "who painted the mona lisa", "answer": "The Mona Lisa was painted by Leonardo da Vinci."},
+]
+
+
+@pytest.fixture
+def kb(tmp_path):
+    path = tmp_path / "knowledge.json"
+    path.write_text(json.dumps(ENTRIES), encoding="utf-8")
+    return KnowledgeBase(str(path))
+
+
+def test_exact_question_hits(kb):
+    answer, _ = kb.lookup("What is the capital of India?")
+    assert answer == "New Delhi is the capital of India."
+
+
+def test_typo_still_hits(kb):
+    answer, _ = kb.lookup("what is the capitol of india")
+    assert answer == "New Delhi is the capital of India."
+
+
+@pytest.mark.parametrize("question", [
+    "What is the capital of Indiana?",
+    "what is the capital of indiana",
+    "What is the capital of Prussia?",
+    "What is the capital of Iraq?",
+])
+def test_similar_place_names_miss(kb, question):
+    answer, _ = kb.lookup(question)
+    assert answer is None
+
+
+def test_stats_count_hits(kb):
+    kb.lookup("What is the capital of India?")
+    kb.lookup("What is the capital of Indiana?")
+    stats = kb.stats()
+    assert stats["lookups"] == 2
+    assert stats["hits"] == 1
+
+
+def test_is_typo():
+    assert is_typo("capitol", "capital", 85)
+    assert not is_typo("india", "indiana", 85)
+    assert not is_typo("russia", "prussia", 85)
+
+
+def test_proper_tokens_skip_first_word():
+    assert proper_tokens("What is the capital of India?") == {"india"}
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+pytest.importorskip("pytesseract")
+Image = pytest.importorskip("PIL.Image")
+
+import ocr_engine  # noqa: E402
+from content_cache import ContentCache  # noqa: E402
+
+
+def two_tone(size=(40, 20), dark=40, light=210):
+    image = Image.new("L", size, light)
+    image.paste(dark, (0, 0, size[0] // 2, size[1]))
+    return image
+
+
+def png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_otsu_threshold_splits_the_two_tones():
+    assert 40 <= ocr_engine.otsu_threshold(two_tone()) < 210
+
+
+def test_preprocess_binarizes_and_downscales():
+    image = ocr_engine.preprocess(two_tone((400, 200)), max_side=100)
+    assert image.mode == "1"
+    assert max(image.size) == 100
+
+
+def test_default_worker_count_leaves_cores_free(monkeypatch):
+    monkeypatch.delenv("OCR_WORKERS", raising=False)
+    monkeypatch.setattr(ocr_engine.os, "cpu_count", lambda: 16)
+    assert ocr_engine._worker_count() == 4
+    monkeypatch.setattr(ocr_engine.os, "cpu_count", lambda: 1)
+    assert ocr_engine._worker_count() == 1
+
+
+def test_cached_images_skip_ocr(tmp_path, monkeypatch):
+    images = [png(two_tone(dark=d)) for d in (10, 20)]
+    cache = ContentCache(str(tmp_path))
+    for data, text in zip(images, ["first", "second"]):
+        key = ContentCache.key(ocr_engine.hashlib.sha256(data).hexdigest(), "v1",
+                               ocr_engine.OCR_LANG, ocr_engine.OCR_MAX_SIDE)
+        cache.set("ocr", key, text)
+    monkeypatch.setattr(ocr_engine, "_get_pool", lambda: pytest.fail("OCR ran for a cached image"))
+    assert ocr_engine.ocr_images(images, cache=cache, cache_version="v1") == ["first", "second"]
@@ -0,0 +1,41 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+import pdf_extraction  # noqa: E402
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    for i in range(7):
+        page = doc.new_page()
+        if i != 3:
+            page.insert_text((72, 72), f"page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_ranges_cover_every_page_once():
+    assert pdf_extraction._ranges(7, 3) == [(0, 3), (3, 6), (6, 7)]
+    assert pdf_extraction._ranges(0, 3) == []
+
+
+def test_pool_matches_serial_extraction(pdf, monkeypatch):
+    monkeypatch.setenv("PDF_EXTRACT_WORKERS", "2")
+    serial = list(pdf_extraction.extract_pages(pdf, parallel=False))
+    try:
+        pooled = list(pdf_extraction.extract_pages(pdf, parallel=True, pages_per_task=2))
+    finally:
+        pdf_extraction._reset_pool()
+    assert [n for n, _ in pooled] == list(range(1, 8))
+    assert pooled == serial
+
+
+def test_extract_text_keeps_empty_pages(pdf):
+    pages = pdf_extraction.extract_text(pdf).split("\f")
+    assert len(pages) == 7
+    assert pages[3].strip() == ""
+    assert "page 5" in pages[4]
@@ -0,0 +1,54 @@
+import pytest
+
+from response_cache import NAME_PLACEHOLDER, ResponseCache, depersonalize, personalize
+
+
+def share(text, author, reader):
+    """What `reader` is served after `author`'s answer went through the cache."""
+    cached = depersonalize(text, author)
+    return None if cached is None else personalize(cached, reader)
+
+
+def test_greeting_name_is_templated():
+    text = "Great question, Priya! The Constitution came into force in 1950."
+    assert depersonalize(text, "Priya") == f"Great question, {NAME_PLACEHOLDER}! The Constitution came into force in 1950."
+    assert share(text, "Priya", "Asha") == "Great question, Asha! The Constitution came into force in 1950."
+
+
+def test_first_name_of_full_name_is_templated():
+    text = "Hi Priya! Photosynthesis turns light into chemical energy."
+    assert share(text, "Priya Sharma", "Asha") == "Hi Asha! Photosynthesis turns light into chemical energy."
+
+
+@pytest.mark.parametrize("placeholder", ["there", "Anonymous", "guest"])
+def test_generic_names_are_never_templated(placeholder):
+    text = "Hi! In India there is a separation of powers between the three organs."
+    assert depersonalize(text, placeholder) == text
+    assert share(text, placeholder, "Priya") == text
+
+
+def test_name_inside_a_word_is_left_alone():
+    text = "Sure, Ram! The Ramayana was written by Valmiki."
+    assert share(text, "Ram", "Asha") == "Sure, Asha! The Ramayana was written by Valmiki."
+
+
+def test_name_in_the_body_is_not_cacheable():
+    text = "Hello! Remember, Ram, that Lord Ram is the hero of the Ramayana."
+    assert depersonalize(text, "Ram") is None
+
+
+def test_answer_without_the_name_is_unchanged():
+    text = "The mitochondria is the powerhouse of the cell."
+    assert depersonalize(text, "Priya") == text
+
+
+def test_lru_evicts_oldest_entry():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from llm_engine import compact_state
+from session_store import SessionStore, state_bytes
+
+
+def fake_state(n_tokens=8, n_vocab=1000, kv=1024):
+    return SimpleNamespace(
+        input_ids=np.zeros(n_tokens, dtype=np.intc),
+        scores=np.zeros((n_tokens, n_vocab), dtype=np.single),
+        n_tokens=n_tokens,
+        llama_state_size=kv,
+    )
+
+
+def test_history_is_kept_per_owner():
+    store = SessionStore()
+    store.record_turn("s1", "42", "hi", "hello")
+    assert store.history("s1", "42") == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+    assert store.history("s1", "43") == []
+    assert store.get("s1", "42").turns == 1
+
+
+def test_client_history_resets_turn_count():
+    store = SessionStore()
+    store.record_turn("s1", "42", "a", "b")
+    history = [{"role": "user", "content": "q1"}, {"role": "assistant", "content": "a1"},
+               {"role": "user", "content": "q2"}, {"role": "assistant", "content": "a2"}]
+    store.record_turn("s1", "42", "q3", "a3", history=history)
+    assert store.get("s1", "42").turns == 3
+    assert len(store.history("s1", "42")) == 6
+
+
+def test_state_bytes_counts_scores():
+    state = fake_state()
+    assert state_bytes(state) == 1024 + state.scores.nbytes + state.input_ids.nbytes
+
+
+def test_compact_state_keeps_last_logits_row():
+    state = fake_state()
+    state.scores[-1, 0] = 1.0
+    compact_state(state)
+    assert state.scores.shape == (1, 1000)
+    assert state.scores[0, 0] == 1.0
+
+
+def test_budget_drops_kv_state_before_sessions():
+    state = fake_state()
+    store = SessionStore(max_bytes=state_bytes(state) + 1024)
+    store.record_turn("s1", "1", "q", "a", kv_state=state)
+    store.record_turn("s2", "2", "q", "a", kv_state=fake_state())
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["with_kv_state"] == 1
+    assert stats["kv_evictions"] == 1
+    assert store.kv_state("s1", "1") is None
+    assert store.kv_state("s2", "2") is not None
+
+
+def test_idle_sessions_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("session_store.time.monotonic", lambda: clock[0])
+    store = SessionStore(idle_ttl=60)
+    store.record_turn("s1", "1", "q", "a")
+    clock[0] += 61
+    assert store.get("s1", "1") is None
+    assert store.stats()["expirations"] == 1
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers, e.g. `gunicorn wsgi:app`.
+
+app.py only builds the app under `__main__`, so it can be re-imported by
+process pool workers (spawn start method) without loading the routes or
+the models.
+"""
+from app import bootstrap
+
+app = bootstrap()